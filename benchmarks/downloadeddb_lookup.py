@@ -0,0 +1,90 @@
+"""Compare the per-file and batched "previously downloaded" lookups of DownloadedDB.
+
+Usage:
+    ''python -m benchmarks.downloadeddb_lookup [images_count] [downloaded_count]''
+
+A temporary DownloadedDB is filled with 'downloaded_count' records, then
+'images_count' files (half of them previously downloaded) are resolved with
+fileIsPreviouslyDownloaded, one call per file, and with filesPreviouslyDownloaded,
+one call per 500 images batch, first without then with the in-memory
+index of the downloaded files.
+"""
+import sys
+import time
+import datetime
+import tempfile
+from pathlib import Path
+
+from fotocop.models.sqlpersistence import DownloadedDB
+
+
+def main(imagesCount: int = 20000, downloadedCount: int = 100000) -> None:
+    with tempfile.TemporaryDirectory() as tmpDir:
+        db = DownloadedDB(Path(tmpDir) / "downloaded_images.sqlite")
+        now = datetime.datetime.now()
+        db.addDownloadedFiles(
+            [
+                (f"IMG_{i:06d}.RAF", 1000 + i, float(i), f"D:/Photos/{i}.raf", now)
+                for i in range(downloadedCount)
+            ]
+        )
+
+        # Half of the scanned images are previously downloaded ones.
+        step = max(1, downloadedCount // imagesCount)
+        records = [
+            (f"IMG_{i:06d}.RAF", 1000 + i, float(i))
+            if n % 2
+            else (f"NEW_{i:06d}.RAF", 1000 + i, float(i))
+            for n, i in enumerate(range(0, imagesCount * step, step))
+        ]
+
+        start = time.perf_counter()
+        perFile = sum(
+            db.fileIsPreviouslyDownloaded(*record) is not None for record in records
+        )
+        perFileTime = time.perf_counter() - start
+
+        batchSize = 500
+        start = time.perf_counter()
+        batched = sum(
+            len(db.filesPreviouslyDownloaded(records[i:i + batchSize]))
+            for i in range(0, len(records), batchSize)
+        )
+        batchedTime = time.perf_counter() - start
+
+        start = time.perf_counter()
+        db.loadIndex()
+        indexLoadTime = time.perf_counter() - start
+
+        start = time.perf_counter()
+        indexed = sum(
+            len(db.filesPreviouslyDownloaded(records[i:i + batchSize]))
+            for i in range(0, len(records), batchSize)
+        )
+        indexedTime = time.perf_counter() - start
+
+        # Lookups of never downloaded files only: answered by the index alone.
+        newRecords = records[::2]
+        start = time.perf_counter()
+        for i in range(0, len(newRecords), batchSize):
+            db.filesPreviouslyDownloaded(newRecords[i:i + batchSize])
+        newOnlyTime = time.perf_counter() - start
+        indexSize = db.indexSize
+        db.close()
+
+    print(f"{imagesCount} lookups in a {downloadedCount} rows table:")
+    print(f"  per file: {perFileTime:.3f} s ({perFile} found)")
+    print(
+        f"  batched:  {batchedTime:.3f} s ({batched} found, {batchSize} per batch)"
+        f" - x{perFileTime / batchedTime:.1f}"
+    )
+    print(
+        f"  indexed:  {indexedTime:.3f} s ({indexed} found)"
+        f" - x{perFileTime / indexedTime:.1f}"
+    )
+    print(f"  indexed, new files only: {newOnlyTime:.3f} s")
+    print(f"  index: {indexSize / 1024:.0f} KiB loaded in {indexLoadTime:.3f} s")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
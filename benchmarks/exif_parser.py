@@ -0,0 +1,79 @@
+"""Compare the per-image exif loading latency of exifparser and exiftool.
+
+Usage:
+    ''python -m benchmarks.exif_parser images_folder''
+
+The date and thumbnail tags of all images found in 'images_folder' (and its
+subfolders) are read one image at a time, first with the native exifparser then
+with a running exiftool process, as the ExifLoader does for a LOAD_ALL command.
+The images the native parser cannot read (and that would fall back to exiftool)
+are counted and excluded from its latency. exiftool must be in the PATH.
+
+Run it twice and keep the second results, so that the images are in the OS cache.
+"""
+import os
+import sys
+import time
+import statistics
+from pathlib import Path
+
+from fotocop.util import exiftool
+from fotocop.util.exifparser import readExif, readThumbnail
+from fotocop.models.exifloader import (
+    THUMBNAIL_TAGS,
+    DATETIME_TAG,
+    THUMBNAIL_OFFSET_TAG,
+    THUMBNAIL_LENGTH_TAG,
+)
+from fotocop.models.imagescanner import IMAGE_EXTENSIONS
+
+
+def report(label: str, latencies) -> None:
+    if not latencies:
+        print(f"{label:>10}: no images")
+        return
+    latencies = [latency * 1000 for latency in latencies]
+    print(
+        f"{label:>10}: {len(latencies)} images, "
+        f"mean {statistics.mean(latencies):6.2f} ms, "
+        f"median {statistics.median(latencies):6.2f} ms, "
+        f"max {max(latencies):7.2f} ms"
+    )
+
+
+def main(folder: str) -> None:
+    imageKeys = [
+        path.as_posix()
+        for path in Path(folder).rglob("*")
+        if os.path.splitext(path.name)[1].lower() in IMAGE_EXTENSIONS
+    ]
+
+    nativeLatencies = list()
+    unknownCount = 0
+    for imageKey in imageKeys:
+        start = time.perf_counter()
+        exif = readExif(imageKey)
+        elapsed = time.perf_counter() - start
+        if exif is None:
+            unknownCount += 1
+        else:
+            nativeLatencies.append(elapsed)
+
+    exifToolLatencies = list()
+    with exiftool.ExifTool() as exifTool:
+        for imageKey in imageKeys:
+            start = time.perf_counter()
+            exif = exifTool.get_tags([*THUMBNAIL_TAGS, DATETIME_TAG], imageKey)
+            if THUMBNAIL_OFFSET_TAG in exif and THUMBNAIL_LENGTH_TAG in exif:
+                readThumbnail(
+                    imageKey, exif[THUMBNAIL_OFFSET_TAG], exif[THUMBNAIL_LENGTH_TAG]
+                )
+            exifToolLatencies.append(time.perf_counter() - start)
+
+    report("exifparser", nativeLatencies)
+    print(f"{'':>10}  {unknownCount} images would fall back to exiftool")
+    report("exiftool", exifToolLatencies)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1])
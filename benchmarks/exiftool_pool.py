@@ -0,0 +1,74 @@
+"""Measure the exif loading throughput of an ExifToolPool by pool size.
+
+Usage:
+    ''python -m benchmarks.exiftool_pool images_folder [batch_size] [sizes...]''
+
+The date and thumbnail tags of all images found in 'images_folder' (and its
+subfolders) are loaded by batches of 'batch_size' images (50 by default), as the
+ExifLoader does when building the timeline, with pools of 1, 2, 4 and 8 exiftool
+processes (or the given sizes). exiftool must be in the PATH.
+
+Run it twice and keep the second results, so that the images are in the OS cache.
+"""
+import os
+import sys
+import time
+import threading
+from pathlib import Path
+
+from fotocop.models.exifloader import ExifToolPool, THUMBNAIL_TAGS, DATETIME_TAG
+from fotocop.models.imagescanner import IMAGE_EXTENSIONS
+
+
+def loadAll(pool: ExifToolPool, imageKeys, batchSize: int) -> float:
+    batches = [
+        imageKeys[start:start + batchSize]
+        for start in range(0, len(imageKeys), batchSize)
+    ]
+    remaining = [len(batches)]
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def loadBatch(batch):
+        pool.exifTool.get_tags_batch([*THUMBNAIL_TAGS, DATETIME_TAG], batch)
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                done.set()
+
+    start = time.perf_counter()
+    for batch in batches:
+        pool.submit(loadBatch, batch)
+    done.wait()
+    return time.perf_counter() - start
+
+
+def main(folder: str, batchSize: int = 50, *sizes: int) -> None:
+    imageKeys = [
+        path.as_posix()
+        for path in Path(folder).rglob("*")
+        if os.path.splitext(path.name)[1].lower() in IMAGE_EXTENSIONS
+    ]
+    if not imageKeys:
+        print(f"No images found in {folder}")
+        return
+    print(f"{len(imageKeys)} images, {os.cpu_count()} CPUs, batches of {batchSize}")
+
+    baseline = None
+    for size in sizes or (1, 2, 4, 8):
+        pool = ExifToolPool(size)
+        pool.start()
+        try:
+            elapsed = loadAll(pool, imageKeys, batchSize)
+        finally:
+            pool.stop()
+        baseline = baseline or elapsed
+        print(
+            f"{size:>2} exiftool: {elapsed:7.2f} s, "
+            f"{len(imageKeys) / elapsed:7.1f} images/s, "
+            f"speedup x{baseline / elapsed:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1], *(int(arg) for arg in sys.argv[2:]))
@@ -0,0 +1,88 @@
+"""Compare the memory used by the images of a source: dict of dataclasses vs store.
+
+Usage:
+    ''python -m benchmarks.image_store [images_count] [folders_count]''
+
+'images_count' images spread over 'folders_count' folders are added to a dict of
+Image dataclasses by path (the legacy Source images) and to an ImageStore, then
+given a date/time as when the timeline is built. The memory allocated per image, measured
+with tracemalloc, and the adding time are reported for both.
+"""
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from fotocop.models.imagestore import ImageStore, Datation
+
+ROOT = "E:/"
+
+
+@dataclass()
+class LegacyImage:
+    name: str
+    path: str
+    downloadPath: str = None
+    downloadTime: datetime = None
+    size: int = None
+    mtime: float = None
+
+    def __post_init__(self):
+        self.extension: str = Path(self.name).suffix
+        self.stem: str = Path(self.name).stem
+        self.isPreviouslyDownloaded: bool = False
+        self.isSelected: bool = True
+        self.datetime: Optional[Datation] = None
+        self.session: str = ""
+        self.loadingInProgress: bool = False
+        self.thumbnailLoadingInProgress: bool = False
+
+
+def makeImages(imagesCount: int, foldersCount: int):
+    perFolder = max(1, imagesCount // foldersCount)
+    for i in range(imagesCount):
+        name = f"DSCF{i:06d}.RAF"
+        path = f"{ROOT}DCIM/{100 + i // perFolder}_FUJI/{name}"
+        yield name, path, 30_000_000 + i, 1_600_000_000.0 + i
+
+
+def fillLegacy(imagesCount: int, foldersCount: int):
+    images = dict()
+    for name, path, size, mtime in makeImages(imagesCount, foldersCount):
+        image = LegacyImage(name, path, None, None, size, mtime)
+        image.datetime = Datation("2021", "01", "02", "03", "04", "05")
+        images[path] = image
+    return images
+
+
+def fillStore(imagesCount: int, foldersCount: int):
+    images = ImageStore()
+    for imageKey, (name, path, size, mtime) in enumerate(
+        makeImages(imagesCount, foldersCount)
+    ):
+        image = images.add(imageKey, name, path, None, None, size, mtime)
+        image.datetime = Datation("2021", "01", "02", "03", "04", "05")
+    return images
+
+
+def main(imagesCount: int = 100_000, foldersCount: int = 100) -> None:
+    for label, fill in (("legacy", fillLegacy), ("store", fillStore)):
+        tracemalloc.start()
+        start = time.perf_counter()
+        images = fill(imagesCount, foldersCount)
+        elapsed = time.perf_counter() - start
+        allocated, _peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert len(images) == imagesCount
+        print(
+            f"{label:>6}: {allocated / imagesCount:6.1f} bytes per image, "
+            f"added in {elapsed * 1000:.0f} ms"
+        )
+        del images
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,65 @@
+"""Compare the legacy and columnar encodings of the ImageScanner images batches.
+
+Usage:
+    ''python -m benchmarks.images_batch [images_count] [folders_count]''
+
+A batch of 'images_count' images spread over 'folders_count' folders of a device is
+encoded as the legacy list of (name, path, downloadPath, downloadTime) tuples and as
+an ImagesBatch. The pickled size per image (the bytes sent over the Pipe) and the
+unpickling and decoding time (as done on the GUI side) are reported for both.
+"""
+import sys
+import time
+import pickle
+import datetime
+
+from fotocop.models.imagescanner import ImagesBatch
+
+ROOT = "E:/"
+
+
+def makeImages(imagesCount: int, foldersCount: int):
+    perFolder = max(1, imagesCount // foldersCount)
+    now = datetime.datetime.now()
+    images = list()
+    for i in range(imagesCount):
+        name = f"DSCF{i:04d}.RAF"
+        path = f"{ROOT}DCIM/{100 + i // perFolder}_FUJI/{name}"
+        downloaded = i % 10 == 0
+        images.append(
+            (
+                name,
+                path,
+                30_000_000 + i,
+                1_600_000_000.0 + i,
+                f"D:/Photos/2021/{name}" if downloaded else None,
+                now if downloaded else None,
+            )
+        )
+    return images
+
+
+def main(imagesCount: int = 2000, foldersCount: int = 20) -> None:
+    images = makeImages(imagesCount, foldersCount)
+
+    legacy = [(name, path, dPath, dTime) for name, path, _s, _m, dPath, dTime in images]
+    columnar = ImagesBatch(ROOT)
+    for image in images:
+        columnar.append(*image)
+
+    for label, batch in (("legacy", legacy), ("columnar", columnar)):
+        data = pickle.dumps(batch)
+        start = time.perf_counter()
+        decoded = pickle.loads(data)
+        pathIndex = 1 if batch is legacy else 2
+        keys = {image[pathIndex]: image for image in decoded}
+        elapsed = time.perf_counter() - start
+        assert len(keys) == imagesCount
+        print(
+            f"{label:>8}: {len(data) / imagesCount:6.1f} bytes per image, "
+            f"decoded in {elapsed * 1000:.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -112,6 +112,7 @@ def __init__(self, sourceManager: SourceManager, splash, *args, **kwargs) -> Non
         self._sourceManager.imagesInfoChanged.connect(self._downloader.updateImagesInfo)
         self._sourceManager.imagesInfoChanged.connect(self.updateDownloadButtonText)
         self._sourceManager.imagesInfoChanged.connect(thumbnailViewer.updateToolbar)
+        self._sourceManager.imagesInfoChanged.connect(thumbnailViewer.updateImages)
 
         self._sourceManager.timelineBuilt.connect(timelineViewer.finalizeTimeline)
 
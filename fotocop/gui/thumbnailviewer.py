@@ -1,7 +1,8 @@
 import logging
+import math
 from enum import IntEnum, Enum
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, List, Dict, Optional, cast
+from typing import TYPE_CHECKING, Any, List, Dict, Optional, Set, Tuple, cast
 
 import PyQt5.QtCore as QtCore
 import PyQt5.QtWidgets as QtWidgets
@@ -11,6 +12,7 @@
 from fotocop.util.rangeutil import runs
 from fotocop.models import settings as Config
 from fotocop.models.sources import Source, ImageProperty
+from fotocop.models.exifloader import RenderedThumbnail, RENDERED_THUMBNAIL_WIDTH
 from fotocop.models.timeline import TimeRange
 from .timelineviewer import tlv
 
@@ -19,7 +21,7 @@
 
 logger = logging.getLogger(__name__)
 
-THUMB_WIDTH = 150
+THUMB_WIDTH = RENDERED_THUMBNAIL_WIDTH
 THUMB_HEIGHT = 112
 THUMB_HEIGHT_3_2 = 100
 THUMB_TOP_3_2 = 6
@@ -31,6 +33,8 @@
 CELL_WIDTH = CELL_IN_WIDTH + 2 * CELL_MARGIN
 CELL_HEIGHT = CELL_IN_HEIGHT + 2 * CELL_MARGIN
 THUMB_MARGIN = (CELL_IN_WIDTH - THUMB_HEIGHT) / 2
+VISIBLE_ROWS_UPDATE_DELAY = 100  # ms after the last scroll or layout change
+DATA_CHANGED_FLUSH_DELAY = 16  # ms, about once per frame
 
 
 class ImageModel(QtCore.QAbstractListModel):
@@ -45,8 +49,17 @@ def __init__(self, parent=None):
 
         self._sourceSelection: Optional["Source"] = None
         self._images: List["ImageKey"] = list()
+        self._rows: Dict["ImageKey", int] = dict()
         self.sessionRequired = False
 
+        # The rows changed by the thumbnails and date/time arrivals, by changed
+        # roles, are notified at once by merged dataChanged ranges.
+        self._changedRows: Dict[Tuple[int, ...], Set[int]] = dict()
+        self._dataChangedTimer = QtCore.QTimer(self)
+        self._dataChangedTimer.setSingleShot(True)
+        self._dataChangedTimer.setInterval(DATA_CHANGED_FLUSH_DELAY)
+        self._dataChangedTimer.timeout.connect(self._flushDataChanged)
+
     def rowCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
         return len(self._images)
 
@@ -172,22 +185,41 @@ def setSourceSelection(self, source: "Source") -> None:
     def clearImages(self) -> None:
         self.beginResetModel()
         self._images = list()
+        self._rows = dict()
+        self._changedRows = dict()
+        self._dataChangedTimer.stop()
         self.endResetModel()
 
     def addImages(self, images: List["ImageKey"]):
         row = self.rowCount()
         self.beginInsertRows(QtCore.QModelIndex(), row, row + len(images) - 1)
         self._images.extend(images)
+        self._rows.update(zip(images, range(row, row + len(images))))
         self.endInsertRows()
 
     def updateImage(self, imageKey: "ImageKey") -> None:
-        index = self._indexFromImageKey(imageKey)
-        if index.isValid():
-            self.dataChanged.emit(
-                index,
-                index,
-                (ImageModel.UserRoles.ThumbnailRole, ImageModel.UserRoles.DateTimeRole),
-            )
+        self.updateImages(
+            [imageKey],
+            (ImageModel.UserRoles.ThumbnailRole, ImageModel.UserRoles.DateTimeRole),
+        )
+
+    def updateImages(self, imageKeys: List["ImageKey"], roles: Tuple[int, ...]) -> None:
+        """Notify the change of the images' roles, on the next dataChanged flush."""
+        rows = self._rows
+        changedRows = self._changedRows.setdefault(roles, set())
+        for imageKey in imageKeys:
+            row = rows.get(imageKey)
+            if row is not None:
+                changedRows.add(row)
+        if changedRows and not self._dataChangedTimer.isActive():
+            self._dataChangedTimer.start()
+
+    def _flushDataChanged(self) -> None:
+        changedRows = self._changedRows
+        self._changedRows = dict()
+        for roles, rows in changedRows.items():
+            for first, last in runs(sorted(rows)):
+                self.dataChanged.emit(self.index(first, 0), self.index(last, 0), roles)
 
     def setDataRange(
         self,
@@ -221,6 +253,22 @@ def setDataRange(
             self.dataChanged.emit(self.index(first, 0), self.index(last, 0), (role,))
         return True
 
+    def setVisibleRows(self, visibleRows: List[int], nearRows: List[int]) -> None:
+        """Load first the exif of the images in view, then of the ones about to be.
+
+        Args:
+            visibleRows: the rows displayed in the thumbnails view.
+            nearRows: the rows about to be scrolled into view.
+        """
+        sourceSelection = self._sourceSelection
+        if sourceSelection is None:
+            return
+
+        images = self._images
+        sourceSelection.prioritizeExif(
+            [images[row] for row in visibleRows], [images[row] for row in nearRows]
+        )
+
     def selectedImagesCount(self) -> int:
         sourceSelection = self._sourceSelection
         if sourceSelection is None:
@@ -228,6 +276,13 @@ def selectedImagesCount(self) -> int:
 
         return sourceSelection.selectedImagesCount
 
+    def isInTimeRanges(self, row: int, timeRanges: List["TimeRange"]) -> bool:
+        sourceSelection = self._sourceSelection
+        if sourceSelection is None:
+            return True
+
+        return sourceSelection.isInTimeRanges(self._images[row], timeRanges)
+
     def timelineBuilt(self) -> bool:
         sourceSelection = self._sourceSelection
         if sourceSelection is None:
@@ -245,21 +300,15 @@ def _imageKeyFromIndex(self, index: QtCore.QModelIndex) -> Optional["ImageKey"]:
 
         return self._images[row]
 
-    def _indexFromImageKey(self, imageKey: "ImageKey") -> QtCore.QModelIndex:
-        try:
-            row = self._images.index(imageKey)
-        except ValueError:
-            return QtCore.QModelIndex()
-        else:
-            return self.index(row, 0)
-
 
 class ThumbnailDelegate(QtWidgets.QStyledItemDelegate):
     def __init__(self, parent=None):
         super().__init__(parent)
 
         resources = Config.fotocopSettings.resources
-        self._dummyImage = QtGui.QPixmap(f"{resources}/dummy-image.png")
+        self._dummyImage = QtGui.QPixmap(f"{resources}/dummy-image.png").scaledToWidth(
+            THUMB_WIDTH
+        )
 
         self.sessionRequired = False
 
@@ -279,18 +328,21 @@ def paint(
         previouslyDownloaded = index.data(ImageModel.UserRoles.PreviouslyDownloadedRole)
 
         # Build the image pixmap: a portrait dummy image when the image thumbnail is
-        # not yet loaded, the loaded thumbnail with the correct orientation otherwise.
-        if imageThumb == b"loading" or imageThumb == b"":
+        # not yet loaded, the loaded thumbnail otherwise. It is yet scaled and rotated
+        # by the ExifLoader: its pixels are only uploaded.
+        if isinstance(imageThumb, RenderedThumbnail):
+            image = QtGui.QImage(
+                imageThumb.pixels,
+                imageThumb.width,
+                imageThumb.height,
+                imageThumb.bytesPerLine,
+                QtGui.QImage.Format_RGB32,
+            )
+            px = QtGui.QPixmap.fromImage(image)
+        else:
             px = self._dummyImage
-            px = px.scaledToWidth(THUMB_WIDTH)
             aspectRatio = 1.5
             orientation = 0
-        else:
-            px = QtGui.QPixmap()
-            px.loadFromData(imageThumb)
-            px = px.scaledToWidth(THUMB_WIDTH)
-            rm = QtGui.QTransform().rotate(orientation)
-            px = px.transformed(rm)
 
         # Build rect for the pixmap source and target with the correct aspect ratio
         # and orientation.
@@ -664,10 +716,19 @@ def addImages(self, images: Dict["ImageKey", "Image"]) -> None:
         self.selectWidget.setEnabled(True)
         self.newChk.setEnabled(True)
 
-    @QtCore.pyqtSlot(str)
+    @QtCore.pyqtSlot(int)
     def updateImage(self, imageKey: "ImageKey") -> None:
         self.thumbnailView.model().sourceModel().updateImage(imageKey)
 
+    @QtCore.pyqtSlot(list, Enum, object)
+    def updateImages(
+        self, imageKeys: List["ImageKey"], pty: "ImageProperty", _value
+    ) -> None:
+        if pty is ImageProperty.DATETIME:
+            self.thumbnailView.model().sourceModel().updateImages(
+                imageKeys, (ImageModel.UserRoles.DateTimeRole,)
+            )
+
     @QtCore.pyqtSlot(QtCore.QModelIndex, QtCore.QModelIndex, "QVector<int>")
     def onImageModelChanged(
         self,
@@ -907,6 +968,69 @@ def __init__(self, parent=None):
         self.markAsDownloadedAct.setEnabled(False)
         self.markAsDownloadedAct.triggered.connect(self.markImagesAsDownloaded)
 
+        # Report the visible rows to the model once the scroll or layout is settled.
+        self._visibleRowsTimer = QtCore.QTimer(self)
+        self._visibleRowsTimer.setSingleShot(True)
+        self._visibleRowsTimer.setInterval(VISIBLE_ROWS_UPDATE_DELAY)
+        self._visibleRowsTimer.timeout.connect(self.updateVisibleRows)
+        self.verticalScrollBar().valueChanged.connect(self._scheduleVisibleRowsUpdate)
+
+    def setModel(self, model: QtCore.QAbstractItemModel) -> None:
+        super().setModel(model)
+        model.rowsInserted.connect(self._scheduleVisibleRowsUpdate)
+        model.rowsRemoved.connect(self._scheduleVisibleRowsUpdate)
+        model.modelReset.connect(self._scheduleVisibleRowsUpdate)
+        model.layoutChanged.connect(self._scheduleVisibleRowsUpdate)
+
+    def resizeEvent(self, event: QtGui.QResizeEvent) -> None:
+        super().resizeEvent(event)
+        self._scheduleVisibleRowsUpdate()
+
+    def _scheduleVisibleRowsUpdate(self, *_args) -> None:
+        # (Re)start the timer: the update is done once the view is settled.
+        self._visibleRowsTimer.start()
+
+    @QtCore.pyqtSlot()
+    def updateVisibleRows(self) -> None:
+        """Tell the images model which rows are visible and about to be visible.
+
+        The rows about to be visible are the page of rows below and above the
+        visible ones.
+        """
+        proxy = self.model()
+        rowCount = proxy.rowCount()
+        if rowCount == 0:
+            return
+
+        # The last visible row is computed from the grid geometry: the viewport
+        # bottom right corner is rarely within a cell.
+        rect = self.viewport().rect()
+        grid = self.gridSize()
+        firstIndex = self.indexAt(rect.topLeft())
+        if firstIndex.isValid():
+            first = firstIndex.row()
+            top = self.visualRect(firstIndex).top()
+        else:
+            first = 0
+            top = rect.top()
+        columns = max(1, rect.width() // grid.width())
+        lines = max(1, math.ceil((rect.bottom() + 1 - top) / grid.height()))
+        last = min(rowCount, first + columns * lines) - 1
+        pageSize = last - first + 1
+        visibleRows = range(first, last + 1)
+        nearRows = (
+            *range(last + 1, min(rowCount, last + 1 + pageSize)),
+            *range(max(0, first - pageSize), first),
+        )
+
+        def sourceRow(row: int) -> int:
+            return proxy.mapToSource(proxy.index(row, 0)).row()
+
+        proxy.sourceModel().setVisibleRows(
+            [sourceRow(row) for row in visibleRows],
+            [sourceRow(row) for row in nearRows],
+        )
+
     @QtCore.pyqtSlot(QtCore.QItemSelection, QtCore.QItemSelection)
     def selectionChanged(
         self, selected: QtCore.QItemSelection, deselected: QtCore.QItemSelection
@@ -1139,12 +1263,7 @@ def filterAcceptsRow(
         model = self.sourceModel()
 
         if self.isDateFilterOn():
-            index = model.index(sourceRow, 0, sourceParent)
-            dateTime = model.data(index, ImageModel.UserRoles.DateTimeRole)
-            if dateTime:
-                okDate = any(
-                    [tr.start <= dateTime <= tr.end for tr in self.timeRangeFilter()]
-                )
+            okDate = model.isInTimeRanges(sourceRow, self.timeRangeFilter())
 
         isNew = True
         if self.isNewFilterOn():
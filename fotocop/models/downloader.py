@@ -1,4 +1,5 @@
 import logging
+from array import array
 from typing import TYPE_CHECKING, Tuple, Optional, List, Dict, Iterable
 from datetime import datetime
 from pathlib import Path
@@ -78,7 +79,8 @@ def updateImagesInfo(
             value
     ) -> None:
         """Call on SourceManager.imagesInfoChanged signal."""
-        self._imageMover.updateImagesInfo(imageKeys, pty, value)
+        # Image keys are sent packed: bulk updates may change thousands of images.
+        self._imageMover.updateImagesInfo(array("I", imageKeys), pty, value)
         if pty is ImageProperty.SESSION:
             self._imageMover.getImageSamplePreview(self._imageSample)
         if self._source is not None and self._source.timelineBuilt:
@@ -120,7 +122,7 @@ def cancelDownload(self) -> None:
 
     def markImagesAsPreviouslyDownloaded(
             self,
-            downloadedImagesInfo: List[Tuple[str, datetime, Path]]
+            downloadedImagesInfo: List[Tuple["ImageKey", datetime, Path]]
     ) -> None:
         self._source.markImagesAsPreviouslyDownloaded(downloadedImagesInfo)
 
@@ -142,11 +144,11 @@ def downloadStarted(self, count: int) -> None:
     def downloadStatus(self, count: int) -> None:
         self.backgroundActionProgressChanged.emit(count)
 
-    def downloadComplete(self, msg: str, imagesInfo: List[Tuple[str, datetime, Path]]) -> None:
+    def downloadComplete(self, msg: str, imagesInfo: List[Tuple["ImageKey", datetime, Path]]) -> None:
         self.markImagesAsPreviouslyDownloaded(imagesInfo)
         self.backgroundActionCompleted.emit(msg)
 
-    def downloadCancelled(self, msg: str, imagesInfo: List[Tuple[str, datetime, Path]]) -> None:
+    def downloadCancelled(self, msg: str, imagesInfo: List[Tuple["ImageKey", datetime, Path]]) -> None:
         self.markImagesAsPreviouslyDownloaded(imagesInfo)
         self.backgroundActionCompleted.emit(msg)
 
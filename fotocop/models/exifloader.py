@@ -1,140 +1,936 @@
+import os
 import logging
 import base64
-from typing import TYPE_CHECKING
-from enum import Enum, auto
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Dict, List, Tuple, Any, Callable, Optional, Iterable
+from typing import Iterator
+from typing import NamedTuple, Union
+from enum import Enum, IntEnum, IntFlag, auto
+
+import PyQt5.QtCore as QtCore
+import PyQt5.QtGui as QtGui
 
 from fotocop.util import exiftool
+from fotocop.util import exifparser
+from fotocop.util.thumbnailmaker import makeThumbnail
 from fotocop.util.workerutil import BackgroundWorker
+from fotocop.models.sqlpersistence import (
+    ExifCache,
+    CachedExif,
+    ThumbnailCache,
+    CachedThumbnail,
+    FileKey,
+)
 
 if TYPE_CHECKING:
     from fotocop.models.sources import ImageKey
 logger = logging.getLogger(__name__)
 
+Exif = Dict[str, Any]
+DatetimeData = Tuple[str, str, str, str, str, str]
+ThumbnailData = Tuple[bytes, float, int]
+# An image to load the exif of: its key and its path.
+ExifImage = Tuple["ImageKey", str]
+
+
+class RenderedThumbnail(NamedTuple):
+    """A thumbnail ready to be displayed: scaled and rotated RGB32 pixels."""
+    pixels: bytes
+    width: int
+    height: int
+    bytesPerLine: int
+
+
+# The published thumbnail: the rendered image (b"" if none), aspect ratio and
+# orientation.
+RenderedThumbnailData = Tuple[Union[RenderedThumbnail, bytes], float, int]
+
+DATETIME_TAG = "EXIF:DateTimeOriginal"
+# The JPEG thumbnail is located by its offset and length and sliced from the
+# file, rather than sent base64 encoded in the exiftool JSON output.
+THUMBNAIL_IMAGE_TAG = "EXIF:ThumbnailImage"
+THUMBNAIL_OFFSET_TAG = "EXIF:ThumbnailOffset"
+THUMBNAIL_LENGTH_TAG = "EXIF:ThumbnailLength"
+THUMBNAIL_TAGS = [
+    THUMBNAIL_OFFSET_TAG,
+    THUMBNAIL_LENGTH_TAG,
+    "EXIF:ThumbnailTIFF",
+    "EXIF:ImageWidth",
+    "EXIF:ImageHeight",
+    "EXIF:ExifImageWidth",
+    "EXIF:ExifImageHeight",
+    "EXIF:Orientation",
+]
+DEFAULT_DATETIME = ('1970', '01', '01', '00', '00', '00')
+
+# Thumbnails are rendered to the thumbnails view image width (see THUMB_WIDTH).
+RENDERED_THUMBNAIL_WIDTH = 150
+
+# Visible images are loaded by small batches, spread over the exiftool pool, so
+# that the first thumbnails are displayed as soon as possible.
+VISIBLE_BATCH_SIZE = 4
+
+# The exif read from a batch of images are published as they are streamed by
+# exiftool, at most once per interval (in seconds).
+EXIF_PUBLISH_INTERVAL = 0.1
+
+# Processes making the thumbnails of the images without an EXIF thumbnail.
+FALLBACK_THUMBNAIL_PROCESSES = 2
+
+
+class Priority(IntEnum):
+    """Exif load requests priority levels, the highest priority first."""
+    VISIBLE = 0     # Images displayed in the thumbnails view
+    NEAR = 1        # Images about to be scrolled into view
+    BACKGROUND = 2  # Timeline building
+
+
+class Load(IntFlag):
+    """The exif data to load for an image."""
+    DATETIME = 1
+    THUMBNAIL = 2
+    ALL = DATETIME | THUMBNAIL
+
+
+class ExifRequests:
+    """The pending exif load requests, by priority level.
+
+    Requests are queued per image key, with the image path, and dequeued by
+    batches, the highest priority first, so that a request can be re-prioritized
+    (see prioritize) until a pool thread picks it. Requests for an image already
+    pending are merged.
+
+    Each request carries the generation of the source it is issued for. Requests
+    of an older generation than the current one are dropped and a newer
+    generation purges all pending requests (see cancel).
+
+    The requests are drained by at most 'drainersCount' concurrent drainers (the
+    exiftool pool threads): put() tells how many new drainers shall be started and
+    nextBatch() releases a drainer when there is no more pending request.
+
+    Args:
+        batchSize: the maximum images count of a NEAR or BACKGROUND batch.
+        drainersCount: the maximum number of concurrent drainers.
+        datetimeBatchSize: the maximum images count of a BACKGROUND batch loading
+            the date only (timeline building), batchSize if None.
+    """
+
+    def __init__(
+        self,
+        batchSize: int,
+        drainersCount: int,
+        datetimeBatchSize: Optional[int] = None,
+    ) -> None:
+        self._levels: Dict[Priority, "OrderedDict[ImageKey, Load]"] = {
+            priority: OrderedDict() for priority in Priority
+        }
+        self._batchSizes = {
+            Priority.VISIBLE: min(batchSize, VISIBLE_BATCH_SIZE),
+            Priority.NEAR: batchSize,
+            Priority.BACKGROUND: batchSize,
+        }
+        self._datetimeBatchSize = datetimeBatchSize or batchSize
+        self._paths: Dict["ImageKey", str] = dict()
+        self._lock = threading.Lock()
+        self._drainers = 0
+        self._maxDrainers = max(1, drainersCount)
+        self.generation = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(level) for level in self._levels.values())
+
+    def put(
+        self,
+        images: Iterable[ExifImage],
+        load: Load,
+        priority: Priority,
+        generation: int,
+    ) -> int:
+        """Queue the load requests of the (key, path) images at the given priority
+        level.
+
+        An image already pending is moved to the given level if higher, and its
+        requested exif data are merged. Requests of an old generation are dropped.
+
+        Returns:
+            the number of drainers to start.
+        """
+        levels = self._levels
+        paths = self._paths
+        count = 0
+        with self._lock:
+            if generation < self.generation:
+                logger.debug(f"Drop exif requests of old generation {generation}")
+                return 0
+            if generation > self.generation:
+                self._purge(generation)
+            for imageKey, path in images:
+                paths[imageKey] = path
+                keyPriority, keyLoad = priority, load
+                for levelPriority, level in levels.items():
+                    pending = level.pop(imageKey, None)
+                    if pending is not None:
+                        keyPriority = min(priority, levelPriority)
+                        keyLoad = load | pending
+                        break
+                levels[keyPriority][imageKey] = keyLoad
+                count += 1
+            batchSize = self._batchSizeOf(priority, bool(load & Load.THUMBNAIL))
+            batchesCount = -(-count // batchSize)
+            started = min(batchesCount, self._maxDrainers - self._drainers)
+            self._drainers += started
+        return started
+
+    def prioritize(
+        self, visibleKeys: List["ImageKey"], nearKeys: List["ImageKey"]
+    ) -> None:
+        """Re-prioritize the pending requests on the thumbnails view scroll.
+
+        Pending requests of the visible images (resp. about to be visible) are moved
+        to the VISIBLE (resp. NEAR) level. Requests of images scrolled away are
+        demoted to the head of the BACKGROUND level.
+        """
+        targets = dict.fromkeys(nearKeys, Priority.NEAR)
+        targets.update(dict.fromkeys(visibleKeys, Priority.VISIBLE))
+        levels = self._levels
+        background = levels[Priority.BACKGROUND]
+        with self._lock:
+            moving = list(levels[Priority.VISIBLE].items())
+            moving.extend(levels[Priority.NEAR].items())
+            levels[Priority.VISIBLE].clear()
+            levels[Priority.NEAR].clear()
+            for imageKey in targets:
+                load = background.pop(imageKey, None)
+                if load is not None:
+                    moving.append((imageKey, load))
+
+            demoted = list()
+            for imageKey, load in moving:
+                priority = targets.get(imageKey)
+                if priority is None:
+                    demoted.append((imageKey, load))
+                else:
+                    levels[priority][imageKey] = load
+            for imageKey, load in reversed(demoted):
+                background[imageKey] = load
+                background.move_to_end(imageKey, last=False)
+
+    def nextBatch(
+        self,
+    ) -> Optional[Tuple[int, bool, List[Tuple["ImageKey", str, Load]]]]:
+        """Dequeue the next batch of requests, from the highest priority level.
+
+        A batch only holds consecutive requests of a same level, all with or all
+        without a thumbnail to load.
+
+        Returns:
+            the batch generation, whether the thumbnails are to be loaded and the
+            (key, path, load) requests of the batch. None if no request is pending:
+            the calling drainer is released.
+        """
+        paths = self._paths
+        with self._lock:
+            for priority, level in self._levels.items():
+                if level:
+                    break
+            else:
+                self._drainers -= 1
+                return None
+
+            imageKey, load = level.popitem(last=False)
+            thumbnail = bool(load & Load.THUMBNAIL)
+            batchSize = self._batchSizeOf(priority, thumbnail)
+            batch = [(imageKey, paths.pop(imageKey), load)]
+            while level and len(batch) < batchSize:
+                imageKey, load = next(iter(level.items()))
+                if bool(load & Load.THUMBNAIL) is not thumbnail:
+                    break
+                del level[imageKey]
+                batch.append((imageKey, paths.pop(imageKey), load))
+            return self.generation, thumbnail, batch
+
+    def cancel(self, generation: int) -> None:
+        """Purge the pending requests of the generations older than 'generation'."""
+        with self._lock:
+            if generation > self.generation:
+                self._purge(generation)
+
+    def clear(self) -> None:
+        with self._lock:
+            for level in self._levels.values():
+                level.clear()
+            self._paths.clear()
+
+    def _batchSizeOf(self, priority: Priority, thumbnail: bool) -> int:
+        if priority is Priority.BACKGROUND and not thumbnail:
+            return self._datetimeBatchSize
+        return self._batchSizes[priority]
+
+    def _purge(self, generation: int) -> None:
+        # Called with the lock held.
+        purgedCount = sum(len(level) for level in self._levels.values())
+        for level in self._levels.values():
+            level.clear()
+        self._paths.clear()
+        logger.info(
+            f"Exif generation {self.generation} -> {generation}: "
+            f"{purgedCount} pending requests purged"
+        )
+        self.generation = generation
+
+
+class ExifToolPool:
+    """A pool of threads, each one driving its own exiftool process.
+
+    Submitted requests are executed by the first available thread. While a request
+    is executed, the exiftool process of the thread is available through the
+    'exifTool' property, so that requests' code is the same whatever the pool size.
+
+    Args:
+        size: the number of threads and exiftool processes of the pool.
+    """
+
+    def __init__(self, size: int = 1) -> None:
+        self.size = max(1, size)
+        self._requests: queue.Queue = queue.Queue()
+        self._local = threading.local()
+        self._threads: List[threading.Thread] = list()
+
+    @property
+    def exifTool(self) -> exiftool.ExifTool:
+        """The exiftool process of the calling thread."""
+        return self._local.exifTool
+
+    def start(self) -> None:
+        logger.info(f"Starting {self.size} ExifTool...")
+        for i in range(self.size):
+            exifTool = exiftool.ExifTool()
+            exifTool.start()
+            thread = threading.Thread(
+                target=self._work, args=(exifTool,), name=f"ExifTool{i}"
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 1.0) -> None:
+        """Stop the pool threads and their exiftool process.
+
+        Pending requests are discarded: only the ones in progress are completed.
+        """
+        logger.info("Stopping ExifTool...")
+        try:
+            while True:
+                self._requests.get_nowait()
+        except queue.Empty:
+            pass
+        for _ in self._threads:
+            self._requests.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads.clear()
+
+    def submit(self, func: Callable, *args) -> None:
+        self._requests.put((func, args))
+
+    def _work(self, exifTool: exiftool.ExifTool) -> None:
+        self._local.exifTool = exifTool
+        try:
+            while True:
+                request = self._requests.get()
+                if request is None:
+                    break
+                func, args = request
+                try:
+                    func(*args)
+                except Exception as e:  # noqa
+                    logger.exception(f"Cannot execute {func.__name__}{args}: {e}")
+        finally:
+            exifTool.terminate()
+
 
 class ExifLoader(BackgroundWorker):
 
+    NATIVE_PARSER = True    # Read exif with exifparser, exiftool being the fallback
+    USE_EXIF_CACHE = True   # Look up the exif in the persistent cache first
+    USE_THUMBNAIL_CACHE = True  # Look up the thumbnails in the persistent cache first
+    FALLBACK_THUMBNAILS = True  # Make the missing EXIF thumbnails (see thumbnailmaker)
+
     class Command(Enum):
         STOP = auto()
         LOAD_THUMB = auto()
         LOAD_DATE = auto()
         LOAD_ALL = auto()
+        LOAD_DATE_BATCH = auto()
+        LOAD_ALL_BATCH = auto()
+        PRIORITIZE = auto()
+        CANCEL = auto()
 
-    def __init__(self, conn):
+    def __init__(
+        self,
+        conn,
+        exifQueue=None,
+        exifToolsCount: int = 1,
+        exifBatchSize: int = 50,
+        timelineBatchSize: Optional[int] = None,
+    ):
         """
         Create a ExifLoader process instance and save the connection 'conn' to
         the main process.
+
+        When given, 'exifQueue' receives the exif load requests of the images found
+        by the ImageScanner process (pipelined mode).
+
+        Load requests are queued by priority (see ExifRequests) and loaded by
+        batches of at most 'exifBatchSize' images, or 'timelineBatchSize' images when
+        only their date is loaded for the timeline, sharded across a pool of
+        'exifToolsCount' exiftool processes.
         """
-        super().__init__(conn, "ExifLoader")
+        super().__init__(conn, "ExifLoader", exifQueue)
 
         self.registerAction(self.Command.LOAD_THUMB, self._loadThumbnail)
         self.registerAction(self.Command.LOAD_DATE, self._loadDatetime)
         self.registerAction(self.Command.LOAD_ALL, self._loadExif)
+        self.registerAction(self.Command.LOAD_DATE_BATCH, self._loadDatetimes)
+        self.registerAction(self.Command.LOAD_ALL_BATCH, self._loadExifs)
+        self.registerAction(self.Command.PRIORITIZE, self._prioritize)
+        self.registerAction(self.Command.CANCEL, self._cancel)
         self.registerAction(self.Command.STOP, self._stop)
 
-        self.exifTool = None
+        self._exifToolsCount = exifToolsCount
+        self._exifBatchSize = exifBatchSize
+        self._timelineBatchSize = timelineBatchSize
+        self._pool = None
+        self._requests = None
+        self._fallbackPool = None
+        self._fallbacks = set()
+        self._fallbacksLock: Optional[threading.Lock] = None
+
+        self.exifCache = ExifCache() if self.USE_EXIF_CACHE else None
+        self.thumbnailCache = ThumbnailCache() if self.USE_THUMBNAIL_CACHE else None
+
+    @property
+    def exifTool(self) -> exiftool.ExifTool:
+        """The exiftool process of the pool thread executing the request."""
+        return self._pool.exifTool
 
     def _preRun(self) -> None:
-        # Start the exiftool process
-        logger.info("Starting ExifTool...")
-        self.exifTool = exiftool.ExifTool()
-        self.exifTool.start()
+        # Start the exiftool processes
+        self._requests = ExifRequests(
+            self._exifBatchSize, self._exifToolsCount, self._timelineBatchSize
+        )
+        self._pool = ExifToolPool(self._exifToolsCount)
+        self._pool.start()
+        # Created in the worker process: a lock cannot be pickled to spawn it.
+        self._fallbacksLock = threading.Lock()
+        if self.FALLBACK_THUMBNAILS:
+            # The processes are only spawned on the first fallback thumbnail.
+            self._fallbackPool = ProcessPoolExecutor(FALLBACK_THUMBNAIL_PROCESSES)
 
     def _postRun(self) -> None:
-        logger.info("Stopping ExifTool...")
-        self.exifTool.terminate()
-
-    def _loadExif(self, imageKey: "ImageKey"):
-        logger.debug(f"Loading date and thumbnail from exif for {imageKey}...")
-        exif = self.exifTool.get_tags(
-            [
-                "EXIF:ThumbnailImage",
-                "EXIF:ThumbnailTIFF",
-                "EXIF:ImageWidth",
-                "EXIF:ImageHeight",
-                "EXIF:ExifImageWidth",
-                "EXIF:ExifImageHeight",
-                "EXIF:Orientation",
-                "EXIF:DateTimeOriginal",
-            ],
-            imageKey,
+        self._requests.clear()
+        self._pool.stop()
+        if self._fallbackPool is not None:
+            # Wait for the thumbnails being made only: the pool processes are not
+            # stopped on the worker exit.
+            self._cancelFallbacks()
+            self._fallbackPool.shutdown(wait=True)
+        # Close the connections opened by the exiftool threads.
+        for cache in (self.exifCache, self.thumbnailCache):
+            if cache is not None:
+                cache.close()
+
+    def _loadExif(self, imageKey: "ImageKey", path: str, generation: int):
+        self._request([(imageKey, path)], Load.ALL, Priority.VISIBLE, generation)
+
+    def _loadThumbnail(self, imageKey: "ImageKey", path: str, generation: int):
+        self._request([(imageKey, path)], Load.THUMBNAIL, Priority.VISIBLE, generation)
+
+    def _loadDatetime(self, imageKey: "ImageKey", path: str, generation: int):
+        self._request([(imageKey, path)], Load.DATETIME, Priority.VISIBLE, generation)
+
+    def _loadExifs(
+        self,
+        images: List[ExifImage],
+        generation: int,
+        priority: Priority = Priority.BACKGROUND,
+    ):
+        self._request(images, Load.ALL, priority, generation)
+
+    def _loadDatetimes(
+        self,
+        images: List[ExifImage],
+        generation: int,
+        priority: Priority = Priority.BACKGROUND,
+    ):
+        self._request(images, Load.DATETIME, priority, generation)
+
+    def _prioritize(
+        self, visibleKeys: List["ImageKey"], nearKeys: List["ImageKey"]
+    ) -> None:
+        self._requests.prioritize(visibleKeys, nearKeys)
+
+    def _cancel(self, generation: int) -> None:
+        self._requests.cancel(generation)
+        self._cancelFallbacks()
+
+    def _request(
+        self,
+        images: List[ExifImage],
+        load: Load,
+        priority: Priority,
+        generation: int,
+    ) -> None:
+        # Queue the requests and start the required drainers in the exiftool pool:
+        # requests are loaded in the pool threads, not in the worker main loop.
+        for _ in range(self._requests.put(images, load, priority, generation)):
+            self._pool.submit(self._drainRequests)
+
+    def _drainRequests(self) -> None:
+        """Load the pending requests, by batches, until there is no more."""
+        requests = self._requests
+        while True:
+            nextBatch = requests.nextBatch()
+            if nextBatch is None:
+                break
+            generation, thumbnail, batch = nextBatch
+            try:
+                self._loadRequests(generation, thumbnail, batch)
+            except Exception as e:  # noqa
+                logger.exception(f"Cannot load exif of {len(batch)} images: {e}")
+
+    def _loadRequests(
+        self,
+        generation: int,
+        thumbnail: bool,
+        batch: List[Tuple["ImageKey", str, Load]],
+    ) -> None:
+        logger.debug(
+            f"Loading {'date and thumbnail' if thumbnail else 'date time'} "
+            f"from exif for {len(batch)} images..."
         )
-        dateTime = None
-        try:
-            dateTime = exif["EXIF:DateTimeOriginal"]
-        except KeyError:
-            pass
-        if dateTime:  # "YYYY:MM:DD HH:MM:SS"
-            date, time_ = dateTime.split(" ", 1)
-            year, month, day = date.split(":")
-            hour, minute, second = time_.split(":")
-            dateTime = (year, month, day, hour, minute, second)  # noqa
-        else:
-            dateTime = ('1970', '01', '01', '00', '00', '00')
-        self.publishData("datetime", imageKey, dateTime)
+        loads = {path: (imageKey, load) for imageKey, path, load in batch}
+        datetimes = list()
+        thumbnails = list()
+        publishTime = time.perf_counter() + EXIF_PUBLISH_INTERVAL
+        for path, dateTime, thumbData in self._loadBatch(list(loads), thumbnail):
+            if generation != self._requests.generation:
+                # Cancelled while loading: the results are only cached.
+                continue
+            imageKey, load = loads[path]
+            if load & Load.DATETIME:
+                datetimes.append((imageKey, dateTime))
+            if load & Load.THUMBNAIL:
+                if not thumbData[0] and self._fallbackPool is not None:
+                    self._makeFallbackThumbnail(generation, imageKey, path, thumbData)
+                else:
+                    thumbnails.append((imageKey, self._renderThumbnail(thumbData)))
+            if time.perf_counter() >= publishTime:
+                self._publishResults(generation, datetimes, thumbnails)
+                datetimes = list()
+                thumbnails = list()
+                publishTime = time.perf_counter() + EXIF_PUBLISH_INTERVAL
+        self._publishResults(generation, datetimes, thumbnails)
 
+    def _publishResults(
+        self,
+        generation: int,
+        datetimes: List[Tuple["ImageKey", DatetimeData]],
+        thumbnails: List[Tuple["ImageKey", RenderedThumbnailData]],
+    ) -> None:
+        if generation != self._requests.generation:
+            # Cancelled while loading: the results are useless to the new source.
+            logger.debug(f"Drop exif of {len(datetimes)} images of old generation")
+            return
+        if datetimes:
+            self.publishData("datetimes", generation, datetimes)
+        if thumbnails:
+            self.publishData("thumbnails", generation, thumbnails)
+
+    def _makeFallbackThumbnail(
+        self,
+        generation: int,
+        imageKey: "ImageKey",
+        path: str,
+        thumbData: ThumbnailData,
+    ) -> None:
+        """Make the thumbnail of an image without EXIF thumbnail in the fallback
+        process pool. It is published and cached when done.
+        """
+        _, aspectRatio, orientation = thumbData
+        future = self._fallbackPool.submit(makeThumbnail, path)
+        with self._fallbacksLock:
+            self._fallbacks.add(future)
+        future.add_done_callback(
+            partial(
+                self._publishFallbackThumbnail,
+                generation,
+                imageKey,
+                path,
+                aspectRatio,
+                orientation,
+            )
+        )
+
+    def _publishFallbackThumbnail(
+        self,
+        generation: int,
+        imageKey: "ImageKey",
+        path: str,
+        aspectRatio: float,
+        orientation: int,
+        future: Future,
+    ) -> None:
+        with self._fallbacksLock:
+            self._fallbacks.discard(future)
+        if future.cancelled() or generation != self._requests.generation:
+            return
         try:
-            imgstring = exif["EXIF:ThumbnailImage"]
-        except KeyError:
+            imgdata = future.result()
+        except Exception as e:  # noqa
+            logger.warning(f"Cannot make thumbnail of {path}: {e}")
+            imgdata = None
+        thumbData = (imgdata or b"", aspectRatio, orientation)
+        if imgdata and self.thumbnailCache is not None:
+            fileKey = self._getFileKeys([path]).get(path)
+            if fileKey is not None:
+                self.thumbnailCache.putThumbnails(
+                    [(fileKey, CachedThumbnail(*thumbData))]
+                )
+        self.publishData(
+            "thumbnails", generation, [(imageKey, self._renderThumbnail(thumbData))]
+        )
+
+    def _cancelFallbacks(self) -> None:
+        """Cancel the fallback thumbnails not being made yet."""
+        with self._fallbacksLock:
+            fallbacks = list(self._fallbacks)
+        for future in fallbacks:
+            future.cancel()
+
+    def _loadBatch(
+        self, paths: List[str], thumbnail: bool
+    ) -> Iterator[Tuple[str, DatetimeData, Optional[ThumbnailData]]]:
+        """Load the date/time and, optionally, the thumbnail of the images.
+
+        The images found in the exif cache are not read again. Their thumbnail is
+        taken from the thumbnail cache, or else sliced from the file. The others are
+        read (see _getTagsBatch) and added to the caches once all are read.
+
+        Yields:
+            the image path, date/time and thumbnail data (None if not requested) of
+            each image, as soon as loaded: the cached images first.
+        """
+        loadedPaths = set()
+        thumbnails = list()
+        fileKeys = dict()
+        cachedThumbnails = dict()
+        exifCache = self.exifCache
+        thumbnailCache = self.thumbnailCache if thumbnail else None
+        if exifCache is not None or thumbnailCache is not None:
+            fileKeys = self._getFileKeys(paths)
+        if thumbnailCache is not None:
+            cachedThumbnails = thumbnailCache.getThumbnails(list(fileKeys.values()))
+        if exifCache is not None:
+            cachedExifs = exifCache.getExifs(list(fileKeys.values()))
+            for path, fileKey in fileKeys.items():
+                try:
+                    cachedExif = cachedExifs[fileKey]
+                except KeyError:
+                    continue
+                cachedThumbnail = cachedThumbnails.get(fileKey)
+                result = self._fromCache(path, cachedExif, thumbnail, cachedThumbnail)
+                if result is not None:
+                    dateTime, thumbData = result
+                    if thumbnail and cachedThumbnail is None and thumbData[0]:
+                        thumbnails.append((fileKey, CachedThumbnail(*thumbData)))
+                    loadedPaths.add(path)
+                    yield path, dateTime, thumbData
+
+        missingPaths = [path for path in paths if path not in loadedPaths]
+        if missingPaths:
+            if thumbnail:
+                tags = [*THUMBNAIL_TAGS, DATETIME_TAG]
+            else:
+                tags = [DATETIME_TAG]
+            records = list()
+            for path, exif in self._getTagsBatch(tags, missingPaths):
+                dateTime = self._parseDatetime(exif)
+                fileKey = fileKeys.get(path)
+                thumbData = None
+                if thumbnail:
+                    # A fallback thumbnail may be cached for an image without one.
+                    cachedThumbnail = cachedThumbnails.get(fileKey)
+                    thumbData = self._parseThumbnail(exif, cachedThumbnail)
+                    if fileKey is not None and cachedThumbnail is None and thumbData[0]:
+                        thumbnails.append((fileKey, CachedThumbnail(*thumbData)))
+                if exifCache is not None and fileKey is not None and exif:
+                    records.append((fileKey, self._toCache(exif, dateTime, thumbnail)))
+                yield path, dateTime, thumbData
+            if records:
+                exifCache.putExifs(records)
+            logger.debug(
+                f"{len(paths) - len(missingPaths)} exif found in cache, "
+                f"{len(missingPaths)} read"
+            )
+
+        if thumbnailCache is not None and thumbnails:
+            thumbnailCache.putThumbnails(thumbnails)
+
+    @staticmethod
+    def _getFileKeys(paths: List[str]) -> Dict[str, FileKey]:
+        fileKeys = dict()
+        for path in paths:
             try:
-                imgstring = exif["EXIF:ThumbnailTIFF"]
-            except KeyError:
-                imgstring = None
+                stat = os.stat(path)
+            except OSError:
+                continue
+            fileKeys[path] = (
+                os.path.basename(path), stat.st_size, stat.st_mtime
+            )
+        return fileKeys
 
+    def _fromCache(
+        self,
+        path: str,
+        cachedExif: CachedExif,
+        thumbnail: bool,
+        cachedThumbnail: Optional[CachedThumbnail] = None,
+    ) -> Optional[Tuple[DatetimeData, Optional[ThumbnailData]]]:
+        """Get the image date/time and thumbnail from its cached exif and thumbnail.
+
+        Returns:
+            the image date/time and thumbnail data (None if not requested), None if
+            the thumbnail is requested but is neither cached nor can be sliced from
+            the cached location.
+        """
+        dateTime = self._parseDatetime({DATETIME_TAG: cachedExif.dateTime})
+        if not thumbnail:
+            return dateTime, None
+        if cachedThumbnail is not None:
+            return dateTime, tuple(cachedThumbnail)
+        aspectRatio, orientation, offset, length = cachedExif[1:]
+        if aspectRatio is None or offset is None:
+            return None
         try:
-            width = exif["EXIF:ExifImageWidth"]
-            height = exif["EXIF:ExifImageHeight"]
-            aspectRatio = (
-                round(width / height, 1) if width > height else round(height / width, 1)
+            imgdata = exifparser.readThumbnail(path, offset, length)
+        except OSError:
+            imgdata = None
+        if imgdata is None:
+            return None
+        return dateTime, (imgdata, aspectRatio, orientation)
+
+    def _toCache(
+        self, exif: Exif, dateTime: DatetimeData, thumbnail: bool
+    ) -> CachedExif:
+        """Get the exif to cache.
+
+        The image geometry is only known when the thumbnail tags are requested and
+        the thumbnail location is cached only for a sliceable JPEG thumbnail.
+        """
+        cachedDatetime = "{}:{}:{} {}:{}:{}".format(*dateTime)
+        if not thumbnail:
+            return CachedExif(cachedDatetime)
+        aspectRatio, orientation = self._parseGeometry(exif)
+        offset = length = None
+        if isinstance(exif.get(THUMBNAIL_IMAGE_TAG), bytes):
+            offset = exif.get(THUMBNAIL_OFFSET_TAG)
+            length = exif.get(THUMBNAIL_LENGTH_TAG)
+        return CachedExif(cachedDatetime, aspectRatio, orientation, offset, length)
+
+    def _getTagsBatch(
+        self, tags: List[str], paths: List[str]
+    ) -> Iterator[Tuple[str, Exif]]:
+        """Get the tags of all images, with one exiftool call for the images that
+        cannot be read by the native parser.
+
+        Yields:
+            the (image path, exif) of each image: the natively read ones first,
+            then the others as streamed by exiftool. An image for which exiftool
+            returns nothing (e.g. an unreadable file) gets an empty exif.
+        """
+        unknownPaths = list()
+        for path in paths:
+            exif = self._readExif(tags, path)
+            if exif is None:
+                unknownPaths.append(path)
+            else:
+                yield path, exif
+        if unknownPaths:
+            logger.debug(f"Use exiftool for {len(unknownPaths)} unknown images")
+            yield from self._getTagsWithExifTool(tags, unknownPaths)
+
+    def _readExif(self, tags: List[str], path: str) -> Optional[Exif]:
+        """Read the image exif with the native parser.
+
+        Returns:
+            the image exif, None if the native parser is disabled or cannot read the
+            image file.
+        """
+        if not self.NATIVE_PARSER:
+            return None
+        try:
+            return exifparser.readExif(path, THUMBNAIL_OFFSET_TAG in tags)
+        except OSError as e:
+            logger.debug(f"Cannot read exif of {path}: {e}")
+            return None
+
+    def _getTagsWithExifTool(
+        self, tags: List[str], paths: List[str]
+    ) -> Iterator[Tuple[str, Exif]]:
+        """Get the tags of the images with exiftool, image by image as they are
+        output.
+
+        The JPEG thumbnail of each image is sliced from the file: the few ones that
+        cannot be are requested to exiftool once all images are read.
+        """
+        # Date only (timeline building): stop reading at the maker notes, as the
+        # date is in the EXIF IFD.
+        withThumbnail = THUMBNAIL_OFFSET_TAG in tags
+        options = () if withThumbnail else ("-fast2",)
+        pendingPaths = dict.fromkeys(paths)
+        unsliced = dict()
+        try:
+            for index, exif in enumerate(
+                self.exifTool.get_tags_batch_iter(tags, paths, options)
+            ):
+                # exiftool outputs the files' exif in the requested order, but
+                # skips the unreadable ones.
+                path = exif.get("SourceFile")
+                if path not in pendingPaths:
+                    if index >= len(paths) or paths[index] not in pendingPaths:
+                        continue
+                    path = paths[index]
+                del pendingPaths[path]
+                if withThumbnail and not self._sliceThumbnail(path, exif):
+                    unsliced[path] = exif
+                    continue
+                yield path, exif
+        except ValueError as e:
+            # Invalid JSON output.
+            logger.warning(f"Cannot load exif for {len(pendingPaths)} images: {e}")
+        if unsliced:
+            self._loadThumbnailsWithExifTool(unsliced)
+            yield from unsliced.items()
+        for path in pendingPaths:
+            yield path, dict()
+
+    @staticmethod
+    def _sliceThumbnail(path: str, exif: Exif) -> bool:
+        """Read the image JPEG thumbnail from its offset and length in the file.
+
+        Returns:
+            False if the image has a thumbnail that cannot be sliced.
+        """
+        offset = exif.get(THUMBNAIL_OFFSET_TAG)
+        length = exif.get(THUMBNAIL_LENGTH_TAG)
+        if not offset or not length:
+            return True
+        try:
+            thumbnail = exifparser.readThumbnail(path, offset, length)
+        except OSError as e:
+            logger.debug(f"Cannot read thumbnail of {path}: {e}")
+            thumbnail = None
+        if thumbnail is None:
+            return False
+        exif[THUMBNAIL_IMAGE_TAG] = thumbnail
+        return True
+
+    def _loadThumbnailsWithExifTool(self, unsliced: Dict[str, Exif]) -> None:
+        """Request the thumbnails that cannot be sliced to exiftool, as base64
+        data.
+        """
+        logger.debug(f"Cannot slice {len(unsliced)} thumbnails: use exiftool")
+        try:
+            exifList = self.exifTool.get_tags_batch(
+                [THUMBNAIL_IMAGE_TAG], list(unsliced)
             )
-        except KeyError:
+        except ValueError as e:
+            logger.warning(f"Cannot load {len(unsliced)} thumbnails: {e}")
+            return
+        for exif in exifList:
+            path = exif.get("SourceFile")
+            if path in unsliced and THUMBNAIL_IMAGE_TAG in exif:
+                unsliced[path][THUMBNAIL_IMAGE_TAG] = exif[THUMBNAIL_IMAGE_TAG]
+
+    @staticmethod
+    def _parseDatetime(exif: Exif) -> DatetimeData:
+        dateTime = exif.get(DATETIME_TAG)
+        if dateTime:  # "YYYY:MM:DD HH:MM:SS"
             try:
-                width = exif["EXIF:ImageWidth"]
-                height = exif["EXIF:ImageHeight"]
-                aspectRatio = (
-                    round(width / height, 1)
-                    if width > height
-                    else round(height / width, 1)
-                )
-            except KeyError:
-                aspectRatio = 0
+                date, time_ = dateTime.split(" ", 1)
+                year, month, day = date.split(":")
+                hour, minute, second = time_.split(":")
+            except (ValueError, AttributeError):
+                # A malformed date must not lose the dates of the whole batch.
+                logger.debug(f"Invalid date/time: {dateTime!r}")
+            else:
+                return year, month, day, hour, minute, second  # noqa
+        return DEFAULT_DATETIME
 
-        try:
-            rawOrient = exif["EXIF:Orientation"]
-            orientation = 90 if rawOrient == 6 else -90 if rawOrient == 8 else 0
-        except KeyError:
-            orientation = 0
+    @staticmethod
+    def _renderThumbnail(thumbData: ThumbnailData) -> RenderedThumbnailData:
+        """Decode the JPEG thumbnail, scale it to the thumbnails view width and
+        rotate it, so that the GUI only has to upload its pixels.
+        """
+        imgdata, aspectRatio, orientation = thumbData
+        if not imgdata:
+            return b"", aspectRatio, orientation
 
-        thumbData = (b"", aspectRatio, orientation)
-        if imgstring:
-            imgstring = imgstring[7:]
-            imgdata = base64.b64decode(imgstring)
-            thumbData = (imgdata, aspectRatio, orientation)
-
-        self.publishData("thumbnail", imageKey, thumbData)
-
-    def _loadThumbnail(self, imageKey: "ImageKey"):
-        logger.debug(f"Loading thumbnail from exif for {imageKey}...")
-        exif = self.exifTool.get_tags(
-            [
-                "EXIF:ThumbnailImage",
-                "EXIF:ThumbnailTIFF",
-                "EXIF:ImageWidth",
-                "EXIF:ImageHeight",
-                "EXIF:ExifImageWidth",
-                "EXIF:ExifImageHeight",
-                "EXIF:Orientation",
-            ],
-            imageKey,
+        image = QtGui.QImage.fromData(imgdata)
+        if image.isNull():
+            logger.debug("Cannot decode thumbnail")
+            return b"", aspectRatio, orientation
+        image = image.scaledToWidth(
+            RENDERED_THUMBNAIL_WIDTH, QtCore.Qt.SmoothTransformation
+        )
+        if orientation:
+            image = image.transformed(QtGui.QTransform().rotate(orientation))
+        image = image.convertToFormat(QtGui.QImage.Format_RGB32)
+        bits = image.constBits()
+        bits.setsize(image.sizeInBytes())
+        rendered = RenderedThumbnail(
+            bytes(bits), image.width(), image.height(), image.bytesPerLine()
         )
+        return rendered, aspectRatio, orientation
+
+    @staticmethod
+    def _parseThumbnail(exif: Exif, default: ThumbnailData = None) -> ThumbnailData:
+        """Get the thumbnail, its aspect ratio and orientation from the exif.
 
+        Returns:
+            the thumbnail data or, when the exif has no thumbnail, 'default' if given
+            else an empty thumbnail with the image aspect ratio and orientation.
+        """
         try:
-            imgstring = exif["EXIF:ThumbnailImage"]
+            imgstring = exif[THUMBNAIL_IMAGE_TAG]
         except KeyError:
             try:
                 imgstring = exif["EXIF:ThumbnailTIFF"]
             except KeyError:
                 imgstring = None
 
+        aspectRatio, orientation = ExifLoader._parseGeometry(exif)
+
+        if imgstring:
+            if isinstance(imgstring, bytes):
+                # Read by the native parser or sliced from the file
+                return imgstring, aspectRatio, orientation
+            imgstring = imgstring[7:]
+            imgdata = base64.b64decode(imgstring)
+            return imgdata, aspectRatio, orientation
+        if default is not None:
+            return default
+        return b"", aspectRatio, orientation
+
+    @staticmethod
+    def _parseGeometry(exif: Exif) -> Tuple[float, int]:
+        """Get the image aspect ratio and orientation from the exif."""
         try:
             width = exif["EXIF:ExifImageWidth"]
             height = exif["EXIF:ExifImageHeight"]
@@ -159,22 +955,4 @@ def _loadThumbnail(self, imageKey: "ImageKey"):
         except KeyError:
             orientation = 0
 
-        thumbData = (b"", 0, 0)
-        if imgstring:
-            imgstring = imgstring[7:]
-            imgdata = base64.b64decode(imgstring)
-            thumbData = (imgdata, aspectRatio, orientation)
-
-        self.publishData("thumbnail", imageKey, thumbData)
-
-    def _loadDatetime(self, imageKey: "ImageKey"):
-        logger.debug(f"Loading date time from exif for {imageKey}...")
-        dateTime = self.exifTool.get_tag("EXIF:DateTimeOriginal", imageKey)
-        if dateTime:  # "YYYY:MM:DD HH:MM:SS"
-            date, time_ = dateTime.split(" ", 1)
-            year, month, day = date.split(":")
-            hour, minute, second = time_.split(":")
-            dateTime = (year, month, day, hour, minute, second)  # noqa
-        else:
-            dateTime = ('1970', '01', '01', '00', '00', '00')
-        self.publishData("datetime", imageKey, dateTime)
+        return aspectRatio, orientation
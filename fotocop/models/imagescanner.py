@@ -1,22 +1,237 @@
 import logging
-from typing import Optional
+import os
+import time
+import json
+import hashlib
+import pickle
+from array import array
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Iterator, Tuple, List, Dict, Optional
 from pathlib import Path
 from enum import Enum, auto
 
 from fotocop.util.threadutil import StoppableThread
 from fotocop.util.workerutil import BackgroundWorker
-from fotocop.models.sqlpersistence import DownloadedDB, FileDownloaded
+from fotocop.models import settings as Config
+from fotocop.models.sqlpersistence import DownloadedDB
+from fotocop.models.exifloader import ExifLoader
 
 logger = logging.getLogger(__name__)
 
+IMAGE_EXTENSIONS = (".jpg", ".raf", ".nef", ".dng")
+
+# A found image: name, posix path, size and modification time.
+ScannedImage = Tuple[str, str, int, float]
+
+# A folder content in a scan manifest: the folder modification time, its images'
+# name, size and modification time and its subfolders' name.
+FolderContent = Tuple[float, List[Tuple[str, int, float]], List[str]]
+
+
+class ImagesBatch:
+    """A columnar batch of scanned images, as sent to the main process.
+
+    All images of a scan share the same root prefix and the images of a folder share
+    the same folder prefix: the batch stores the root once, a table of the folders
+    relative to the root, and for each image its folder index, name, size and
+    modification time in packed arrays. Download info is stored only for the
+    previously downloaded images.
+
+    The images are given consecutive integer keys, from the batch firstKey, in the
+    scan order: the image key identifies an image of the source in all messages.
+    As the keys restart from 0 at each scan, the batch is tagged with the scan exif
+    generation, so that the batches of an aborted scan are dropped.
+
+    The batch is decoded lazily by iterating over it.
+
+    Attributes:
+        root: the scan root path, with a trailing "/".
+        firstKey: the key of the first image of the batch.
+        generation: the exif generation of the scan.
+    """
+
+    __slots__ = (
+        "root", "firstKey", "generation", "_dirs", "_dirIndexes", "_names", "_sizes", "_mtimes",
+        "_downloads", "_dirIds",
+    )
+
+    def __init__(self, root: str, firstKey: int = 0, generation: int = 0) -> None:
+        self.root = root if root.endswith("/") else f"{root}/"
+        self.firstKey = firstKey
+        self.generation = generation
+        self._dirs: List[str] = list()
+        self._dirIndexes = array("I")
+        self._names: List[str] = list()
+        self._sizes = array("q")
+        self._mtimes = array("d")
+        self._downloads: Dict[int, Tuple[str, datetime]] = dict()
+        self._dirIds: Dict[str, int] = dict()
+
+    def __getstate__(self):
+        return (
+            self.root, self.firstKey, self.generation, self._dirs, self._dirIndexes,
+            self._names, self._sizes, self._mtimes, self._downloads,
+        )
+
+    def __setstate__(self, state) -> None:
+        (
+            self.root, self.firstKey, self.generation, self._dirs, self._dirIndexes,
+            self._names, self._sizes, self._mtimes, self._downloads,
+        ) = state
+        self._dirIds = dict()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __iter__(
+        self,
+    ) -> Iterator[Tuple[int, str, str, int, float, Optional[str], Optional[datetime]]]:
+        """Yield each image key, name, path, size, mtime, download path and time."""
+        root = self.root
+        dirs = [f"{root}{d}" for d in self._dirs]
+        downloads = self._downloads
+        noDownload = (None, None)
+        firstKey = self.firstKey
+        for i, (dirIndex, name, size, mtime) in enumerate(
+            zip(self._dirIndexes, self._names, self._sizes, self._mtimes)
+        ):
+            downloadPath, downloadTime = downloads.get(i, noDownload)
+            yield (
+                firstKey + i, name, f"{dirs[dirIndex]}{name}", size, mtime,
+                downloadPath, downloadTime,
+            )
+
+    @property
+    def downloadedCount(self) -> int:
+        return len(self._downloads)
+
+    def append(
+        self,
+        name: str,
+        path: str,
+        size: int,
+        mtime: float,
+        downloadPath: Optional[str] = None,
+        downloadTime: Optional[datetime] = None,
+    ) -> None:
+        """Add an image: its path must be under the batch root."""
+        dirPath = path[len(self.root):-len(name)]
+        try:
+            dirIndex = self._dirIds[dirPath]
+        except KeyError:
+            dirIndex = self._dirIds[dirPath] = len(self._dirs)
+            self._dirs.append(dirPath)
+        if downloadPath is not None:
+            self._downloads[len(self._names)] = (downloadPath, downloadTime)
+        self._dirIndexes.append(dirIndex)
+        self._names.append(name)
+        self._sizes.append(size)
+        self._mtimes.append(mtime)
+
+
+class ScanManifest:
+    """The folders' content found by the last scan of a source root.
+
+    The manifest records each scanned folder modification time with the images and
+    subfolders found in it. It is persisted in the user cache directory, one file
+    per source root, so that a rescan only enumerates the folders whose modification
+    time changed and replays the recorded content of the others.
+
+    A folder modification time changes when entries are added, removed or renamed in
+    it, not when a file is modified in place: such a change is only seen by a full
+    scan.
+    """
+
+    VERSION = 1
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        digest = hashlib.sha1(root.encode("utf-8")).hexdigest()
+        manifestsDir = Config.fotocopSettings.appDirs.user_cache_dir / "manifests"
+        self._file = manifestsDir / f"{digest}.json"
+        self._folders: Dict[str, FolderContent] = dict()
+        self._scanned: Dict[str, FolderContent] = dict()
+        self.replayedCount = 0
+
+    def load(self) -> "ScanManifest":
+        try:
+            with self._file.open(encoding="utf-8") as fh:
+                manifest = json.load(fh)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cannot load scan manifest of {self.root}: {e}")
+        else:
+            if manifest.get("version") == self.VERSION and manifest.get("root") == self.root:
+                self._folders = manifest["folders"]
+        return self
+
+    def save(self, pruneFolders: bool) -> None:
+        """Save the folders' content found by the current scan.
+
+        Args:
+            pruneFolders: True when the scan walked the whole root tree: folders
+                recorded by a previous scan and not seen anymore are then dropped.
+        """
+        if pruneFolders:
+            folders = self._scanned
+        else:
+            folders = self._folders
+            folders.update(self._scanned)
+        manifest = {"version": self.VERSION, "root": self.root, "folders": folders}
+        try:
+            self._file.parent.mkdir(parents=True, exist_ok=True)
+            with self._file.open(mode="w", encoding="utf-8") as fh:
+                json.dump(manifest, fh, separators=(",", ":"))
+        except (OSError, TypeError) as e:
+            logger.warning(f"Cannot save scan manifest of {self.root}: {e}")
+        else:
+            logger.info(f"Scan manifest of {self.root} saved: {len(folders)} folders")
+
+    def replay(self, dirPath: str, mtime: float) -> Optional[FolderContent]:
+        """Returns the recorded folder content if its modification time is unchanged.
+        """
+        content = self._folders.get(dirPath)
+        if content is None or content[0] != mtime:
+            return None
+        self._scanned[dirPath] = content
+        self.replayedCount += 1
+        return content
+
+    def record(self, dirPath: str, content: FolderContent) -> None:
+        self._scanned[dirPath] = content
+
 
 class ScanHandler(StoppableThread):
-    def __init__(self, path: str, subDirs: bool, worker: "ImageScanner", *args, **kwargs):
+    def __init__(
+        self,
+        path: str,
+        subDirs: bool,
+        worker: "ImageScanner",
+        incremental: bool = False,
+        exifThumbnails: Optional[int] = None,
+        exifGeneration: int = 0,
+        *args,
+        **kwargs,
+    ):
         super().__init__(*args, **kwargs)
         self.name = "StoppableScanHandler"
         self._path = path
         self._subDirs = subDirs
         self._worker = worker
+        self._dirsCount = 0
+        # In pipelined mode, the exif of the found images are requested to the
+        # ExifLoader process as soon as their batch is published, with the thumbnail
+        # for the first exifThumbnails images, tagged with the source exifGeneration.
+        self._exifThumbnails = exifThumbnails
+        self._exifGeneration = exifGeneration
+        self._exifRequestsCount = 0
+        # The key of the next found image.
+        self._nextKey = 0
+        self._manifest: Optional[ScanManifest] = None
+        if incremental and ImageScanner.PARALLEL_WALK:
+            self._manifest = ScanManifest(path)
 
     @property
     def path(self) -> str:
@@ -27,74 +242,259 @@ def run(self) -> None:
         self._scanImages()
 
     def _scanImages(self):
-        path = Path(self._path)
-        walker = path.rglob("*") if self._subDirs else path.glob("*")
+        manifest = self._manifest
+        if manifest is not None:
+            manifest.load()
+        if ImageScanner.PARALLEL_WALK:
+            walkerName = "scandir"
+            walker = self._walk()
+        else:
+            walkerName = "glob"
+            walker = self._glob()
         imagesCount = 0
         batchesCount = 0
         imagesBatch = list()
+        # Batches are flushed when full or when their first image is waiting for
+        # BATCH_DELAY, whichever comes first: the first images are shown quickly
+        # while the growing batch size keeps the messages count low on fast media.
+        batchSize = ImageScanner.FIRST_BATCH_SIZE
+        batchStart = 0.0
         stopped = False
+        walkStart = time.perf_counter()
         try:
-            for f in walker:
+            for image in walker:
                 if self.stopped():
                     logger.info(f"Stop scanning images for {self.path}")
                     stopped = True
                     imagesBatch = list()
                     break
-                if self._isImage(f):
-                    previouslyDownloaded = self._isAlreadyDownloaded(f)
-                    if previouslyDownloaded is not None:
-                        downloadPath, downloadTime = previouslyDownloaded
-                    else:
-                        downloadPath, downloadTime = (None, None)
-                    imagesBatch.append(
-                        (f.name, f.as_posix(), downloadPath, downloadTime)
-                    )
+                if image is not None:
+                    if not imagesBatch:
+                        batchStart = time.perf_counter()
+                    imagesBatch.append(image)
                     imagesCount += 1
-                    logger.debug(f"Found image: {imagesCount} - {f.name}")
-                    if imagesCount % ImageScanner.BATCH_SIZE == 0:
-                        batchesCount += 1
-                        logger.debug(f"Sending images: batch#{batchesCount}")
-                        self._worker.publishData("images", batchesCount, imagesBatch)
-                        imagesBatch = list()
+                    logger.debug(f"Found image: {imagesCount} - {image[0]}")
+                if imagesBatch and (
+                    len(imagesBatch) >= batchSize
+                    or time.perf_counter() - batchStart >= ImageScanner.BATCH_DELAY
+                ):
+                    batchesCount += 1
+                    self._publishImages(batchesCount, imagesBatch)
+                    imagesBatch = list()
+                    batchSize = min(
+                        batchSize * ImageScanner.BATCH_GROWTH,
+                        ImageScanner.MAX_BATCH_SIZE,
+                    )
         except OSError as e:
             logger.error(f"Cannot scan images in {self.path}: {e}")
         finally:
+            walker.close()
             if imagesBatch:
                 batchesCount += 1
-                logger.debug(f"Sending remaining images: batch#{batchesCount}")
-                self._worker.publishData("images", batchesCount, imagesBatch)
+                self._publishImages(batchesCount, imagesBatch)
             if not stopped:
-                logger.info(f"{imagesCount} images found and sent in {batchesCount} batches")
+                logger.info(
+                    f"{imagesCount} images found and sent in {batchesCount} batches"
+                )
+                logger.info(
+                    f"Walked {self._dirsCount} folders of {self.path} in "
+                    f"{time.perf_counter() - walkStart:.3f} s ({walkerName} walker"
+                    f"{'' if manifest is None else f', {manifest.replayedCount} replayed'})"
+                )
+                if manifest is not None:
+                    manifest.save(pruneFolders=self._subDirs)
             self._worker.publishData("ScanComplete", imagesCount, stopped)
 
+    def _walk(self) -> Iterator[Optional[ScannedImage]]:
+        """Walk the source folders with os.scandir, visiting subfolders concurrently.
+
+        Each folder is scanned by a thread of a small pool: found images are yielded
+        as soon as their folder scan completes and the subfolders are submitted to
+        the pool in turn. Images size and modification time come from the DirEntry
+        stat data, cached by the folder enumeration on Windows.
+
+        None is yielded when no folder scan completes within BATCH_DELAY, so that the
+        caller may flush its pending images on slow media.
+        """
+        with ThreadPoolExecutor(
+            max_workers=ImageScanner.WALKER_THREADS, thread_name_prefix="ScanWalker"
+        ) as executor:
+            pending = {executor.submit(self._scanDir, self._path)}
+            try:
+                while pending:
+                    done, pending = wait(
+                        pending,
+                        timeout=ImageScanner.BATCH_DELAY,
+                        return_when=FIRST_COMPLETED,
+                    )
+                    if not done:
+                        yield None
+                        continue
+                    for future in done:
+                        try:
+                            images, subDirs = future.result()
+                        except OSError as e:
+                            logger.warning(f"Cannot scan folder: {e}")
+                            continue
+                        self._dirsCount += 1
+                        if self._subDirs and not self.stopped():
+                            pending.update(
+                                executor.submit(self._scanDir, subDir)
+                                for subDir in subDirs
+                            )
+                        yield from images
+            finally:
+                # Do not start folders' scans not yet begun when walk is interrupted.
+                for future in pending:
+                    future.cancel()
+
+    def _scanDir(self, dirPath: str) -> Tuple[List[ScannedImage], List[str]]:
+        prefix = dirPath if dirPath.endswith("/") else f"{dirPath}/"
+        manifest = self._manifest
+        if manifest is not None:
+            dirMtime = os.stat(dirPath).st_mtime
+            content = manifest.replay(dirPath, dirMtime)
+            if content is not None:
+                _mtime, images, subDirs = content
+                return (
+                    [
+                        (name, f"{prefix}{name}", size, mtime)
+                        for name, size, mtime in images
+                    ],
+                    [f"{prefix}{name}" for name in subDirs],
+                )
+
+        images = list()
+        subDirs = list()
+        with os.scandir(dirPath) as entries:
+            for entry in entries:
+                if self.stopped():
+                    break
+                name = entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subDirs.append(f"{prefix}{name}")
+                    elif self._isImage(name):
+                        stat = entry.stat()
+                        images.append(
+                            (name, f"{prefix}{name}", stat.st_size, stat.st_mtime)
+                        )
+                except OSError as e:
+                    logger.warning(f"Cannot scan {prefix}{name}: {e}")
+
+        if manifest is not None and not self.stopped():
+            manifest.record(
+                dirPath,
+                (
+                    dirMtime,
+                    [(name, size, mtime) for name, _path, size, mtime in images],
+                    [subDir[len(prefix):] for subDir in subDirs],
+                ),
+            )
+        return images, subDirs
+
+    def _glob(self) -> Iterator[ScannedImage]:
+        """Walk the source folders with Path.glob, stating each found image."""
+        path = Path(self._path)
+        walker = path.rglob("*") if self._subDirs else path.glob("*")
+        dirs = set()
+        try:
+            for f in walker:
+                if self._isImage(f.name):
+                    stat = f.stat()
+                    dirs.add(f.parent)
+                    yield f.name, f.as_posix(), stat.st_size, stat.st_mtime
+        finally:
+            self._dirsCount = len(dirs)
+
     @staticmethod
-    def _isImage(path: Path) -> bool:
-        return path.suffix.lower() in (".jpg", ".raf", ".nef", ".dng")
+    def _isImage(name: str) -> bool:
+        return os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
 
-    def _isAlreadyDownloaded(self, imagePath: Path) -> Optional[FileDownloaded]:
-        name = imagePath.name
-        stat = imagePath.stat()
-        size = stat.st_size
-        mtime = stat.st_mtime
-        return self._worker.downloadedDb.fileIsPreviouslyDownloaded(name, size, mtime)
+    def _publishImages(self, batch: int, images: List[ScannedImage]) -> None:
+        # Resolve the previously downloaded images of the whole batch in one query.
+        downloaded = self._worker.downloadedDb.filesPreviouslyDownloaded(
+            [(name, size, mtime) for name, _path, size, mtime in images]
+        )
+        firstKey = self._nextKey
+        self._nextKey += len(images)
+        imagesBatch = ImagesBatch(self._path, firstKey, self._exifGeneration)
+        for name, path, size, mtime in images:
+            try:
+                downloadPath, downloadTime = downloaded[(name, size, mtime)]
+            except KeyError:
+                downloadPath, downloadTime = (None, None)
+            imagesBatch.append(name, path, size, mtime, downloadPath, downloadTime)
+        if logger.isEnabledFor(logging.DEBUG):
+            imagesCount = len(imagesBatch)
+            logger.debug(
+                f"Sending images: batch#{batch}, {imagesCount} images, "
+                f"{len(downloaded)} previously downloaded, "
+                f"{len(pickle.dumps(imagesBatch)) / imagesCount:.1f} bytes per image"
+            )
+        self._worker.publishData("images", batch, imagesBatch)
+        if self._exifThumbnails is not None:
+            self._requestExif(firstKey, images)
+
+    def _requestExif(self, firstKey: int, images: List[ScannedImage]) -> None:
+        # Request the images' exif by batches of exifBatchSize images, loading their
+        # thumbnail while less than exifThumbnails images have been requested.
+        exifQueue = self._worker.exifQueue
+        exifThumbnails = self._exifThumbnails
+        generation = self._exifGeneration
+        batchSize = Config.fotocopSettings.exifBatchSize
+        exifImages = [
+            (imageKey, path)
+            for imageKey, (_name, path, _size, _mtime) in enumerate(images, firstKey)
+        ]
+        requestsCount = self._exifRequestsCount
+        for start in range(0, len(exifImages), batchSize):
+            batch = exifImages[start:start + batchSize]
+            thumbnailsCount = min(max(exifThumbnails - requestsCount, 0), len(batch))
+            if thumbnailsCount:
+                exifQueue.put(
+                    (
+                        ExifLoader.Command.LOAD_ALL_BATCH,
+                        (batch[:thumbnailsCount], generation),
+                    )
+                )
+            if thumbnailsCount < len(batch):
+                exifQueue.put(
+                    (
+                        ExifLoader.Command.LOAD_DATE_BATCH,
+                        (batch[thumbnailsCount:], generation),
+                    )
+                )
+            requestsCount += len(batch)
+        self._exifRequestsCount = requestsCount
 
 
 class ImageScanner(BackgroundWorker):
 
-    BATCH_SIZE = 500
+    FIRST_BATCH_SIZE = 50
+    MAX_BATCH_SIZE = 2000
+    BATCH_GROWTH = 2
+    BATCH_DELAY = 0.2   # in seconds
+    PARALLEL_WALK = True    # Use the os.scandir concurrent walker
+    WALKER_THREADS = 4
 
     class Command(Enum):
         STOP = auto()   # Stop ImageScanner process
         SCAN = auto()   # Start scanning images
         ABORT = auto()  # Abort current scanning
 
-    def __init__(self, conn) -> None:
+    def __init__(self, conn, exifQueue=None) -> None:
         """
         Create a ImageScanner process instance and save the connection 'conn' to
         the main process.
+
+        When given, 'exifQueue' feeds the ExifLoader process with the exif load
+        requests of the found images (pipelined mode).
         """
         super().__init__(conn, "ImageScanner")
 
+        self.exifQueue = exifQueue
+
         self.registerAction(self.Command.SCAN, self._scanImages)
         self.registerAction(self.Command.ABORT, self._stopScanning)
         self.registerAction(self.Command.STOP, self._stop)
@@ -103,10 +503,26 @@ def __init__(self, conn) -> None:
 
         self.downloadedDb = DownloadedDB()
 
-    def _scanImages(self, path: str, subDirs: bool) -> None:
-        # Scan images
+    def _preRun(self) -> None:
+        # Load the downloaded files index once, at worker start.
+        self.downloadedDb.loadIndex()
+
+    def _scanImages(
+        self,
+        path: str,
+        subDirs: bool,
+        incremental: bool = False,
+        exifThumbnails: Optional[int] = None,
+        exifGeneration: int = 0,
+    ) -> None:
+        # Catch up with the files downloaded since the index was loaded and scan images
+        self.downloadedDb.refreshIndex()
+        if self.exifQueue is None:
+            exifThumbnails = None
         logger.debug(f"Start a new scan handler")
-        self._scanHandler = ScanHandler(path, subDirs, self)
+        self._scanHandler = ScanHandler(
+            path, subDirs, self, incremental, exifThumbnails, exifGeneration
+        )
         self._scanHandler.start()
 
     def _stopScanning(self):
@@ -121,6 +537,12 @@ def _stopScanning(self):
             else:
                 logger.info(f"{path} scan handler stopped")
 
+    def _postRun(self) -> None:
+        self.downloadedDb.close()
+        if self.exifQueue is not None:
+            # Do not wait for the ExifLoader to consume the pending requests on exit.
+            self.exifQueue.cancel_join_thread()
+
     def _stop(self):
         self._stopScanning()
         super()._stop()
@@ -10,6 +10,7 @@
 from fotocop.util.pathutil import Path
 from fotocop.models import settings as Config
 from fotocop.models.naming import TemplateType, NamingTemplate
+from fotocop.models.imagestore import ImageStore
 
 if TYPE_CHECKING:
     from fotocop.models.sources import ImageKey, Image, ImageProperty
@@ -204,7 +205,7 @@ def _downloadImages(self):
                 logger.warning(f"Cannot copy {image.name} to {absName.as_posix()}: {e}")
             else:
                 self._worker.sequences.increment(incrementSessionNb, incrementStoredNb)
-                downloadedImagesInfo.append((image.path, downloadTime, absName))
+                downloadedImagesInfo.append((image.key, downloadTime, absName))
             self._worker.publishData("downloaded_images_count", count)
 
         if not stopped:
@@ -290,7 +291,7 @@ def __init__(self, conn):
         self.destination: Optional[Path] = None
         self.imageNamingTemplate: Optional[NamingTemplate] = None
         self.destinationNamingTemplate: Optional[NamingTemplate] = None
-        self._images: Dict["ImageKey", "Image"] = dict()
+        self._images: "ImageStore" = ImageStore()
 
         self._downloadHandler = None
 
@@ -312,7 +313,7 @@ def _setDestinationNamingTemplate(self, template: NamingTemplate) -> None:
     def _clearImages(self) -> None:
         # Clear images in the ImageMover context.
         logger.debug(f"Clear images in context...")
-        self._images = dict()
+        self._images = ImageStore()
 
     def _addImages(self, images: Dict["ImageKey", "Image"]) -> None:
         # Update the ImageMover context with the images in the selected source.
@@ -0,0 +1,466 @@
+"""A compact store of the images of a source.
+
+A source may hold hundreds of thousands of images: rather than one object per image,
+the ImageStore keeps the images' attributes in columns indexed by the image row id.
+The folders of the images are interned in a table, the flags are packed in a byte
+per image, the capture times are packed in a NumPy int64 array (see captureTimes)
+and the rarely set attributes (download info, session) are only stored for the
+images that have them.
+
+Image objects are lightweight views on a store row, built on demand.
+"""
+import os
+import threading
+from array import array
+from typing import TYPE_CHECKING, Optional, Dict, List, Tuple, Iterator, NamedTuple
+from datetime import datetime, timedelta
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from fotocop.models.sources import ImageKey
+
+__all__ = [
+    "ImageStore", "Image", "Datation", "toCaptureTime", "NO_CAPTURE_TIME",
+]
+
+# Image flags
+SELECTED = 0x01
+PREVIOUSLY_DOWNLOADED = 0x02
+LOADING = 0x04
+THUMBNAIL_LOADING = 0x08
+
+# Packed size and mtime value of an unknown size or mtime.
+_UNKNOWN = -1
+
+# Capture times are stored as whole seconds since the epoch, in the images' local
+# time: the exif date/time has no time zone.
+EPOCH = datetime(1970, 1, 1)
+_SECOND = timedelta(seconds=1)
+# Packed capture time of an image whose date/time is not loaded yet.
+NO_CAPTURE_TIME = np.iinfo(np.int64).min
+_MIN_CAPACITY = 1024
+
+
+def toCaptureTime(dateTime: datetime) -> int:
+    """The capture time of a date/time, truncated to the second."""
+    return (dateTime - EPOCH) // _SECOND
+
+
+class Datation(NamedTuple):
+    year: str
+    month: str
+    day: str
+    hour: str
+    minute: str
+    second: str
+
+    def asDatetime(self) -> datetime:
+        return datetime(*[int(s) for s in self])
+
+
+class ImageStore:
+    """The images of a source, stored by columns.
+
+    The store is used as a dict of Image by image key: images are added to it, never
+    removed (the store is cleared as a whole).
+
+    The image keys are the integer ids given by the images' scanner, in the scan
+    order: the store holds a contiguous range of keys, from the key of its first
+    image, and an image row is its key offset in this range. The full path of an
+    image is the only string stored per image: its name is sliced from it past its
+    folder, stored once in the folders' table.
+    """
+
+    __slots__ = (
+        "_firstKey", "_paths", "_dirs", "_dirIds", "_dirIndexes", "_sizes", "_mtimes",
+        "_flags", "_flagsLock", "_captureTimes", "_sessions", "_downloads",
+    )
+
+    def __init__(self) -> None:
+        self._firstKey = 0
+        self._paths: List[str] = list()
+        self._dirs: List[str] = list()
+        self._dirIds: Dict[str, int] = dict()
+        self._dirIndexes = array("I")
+        self._sizes = array("q")
+        self._mtimes = array("d")
+        self._flags = bytearray()
+        # The flags of an image are set from several threads: as they are packed,
+        # setting one must not clobber another.
+        self._flagsLock = threading.Lock()
+        # Grown by doubling its capacity: only the first len(self) items are used.
+        self._captureTimes = np.full(0, NO_CAPTURE_TIME, dtype=np.int64)
+        self._sessions: Dict[int, str] = dict()
+        self._downloads: Dict[int, Tuple[str, datetime]] = dict()
+
+    def __getstate__(self):
+        # The flags lock cannot be pickled, e.g. to spawn the ImageMover worker.
+        return tuple(
+            getattr(self, slot) for slot in self.__slots__ if slot != "_flagsLock"
+        )
+
+    def __setstate__(self, state) -> None:
+        slots = (slot for slot in self.__slots__ if slot != "_flagsLock")
+        for slot, value in zip(slots, state):
+            setattr(self, slot, value)
+        self._flagsLock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def __contains__(self, imageKey: "ImageKey") -> bool:
+        return 0 <= imageKey - self._firstKey < len(self._paths)
+
+    def __iter__(self) -> Iterator["ImageKey"]:
+        return iter(self.keys())
+
+    def __getitem__(self, imageKey: "ImageKey") -> "Image":
+        return Image(self, self.rowOf(imageKey))
+
+    def get(self, imageKey: "ImageKey", default=None) -> Optional["Image"]:
+        try:
+            return Image(self, self.rowOf(imageKey))
+        except KeyError:
+            return default
+
+    @property
+    def nextKey(self) -> "ImageKey":
+        """The key of the next image to add."""
+        return self._firstKey + len(self._paths)
+
+    def keys(self) -> range:
+        # Images added while iterating are not yielded.
+        return range(self._firstKey, self.nextKey)
+
+    def values(self) -> Iterator["Image"]:
+        return (Image(self, row) for row in range(len(self._paths)))
+
+    def items(self) -> Iterator[Tuple["ImageKey", "Image"]]:
+        firstKey = self._firstKey
+        return (
+            (firstKey + row, Image(self, row)) for row in range(len(self._paths))
+        )
+
+    @property
+    def captureTimes(self) -> np.ndarray:
+        """The images' capture time by row (NO_CAPTURE_TIME if not loaded), a view
+        on the store array.
+        """
+        return self._captureTimes[:len(self._paths)]
+
+    def rowOf(self, imageKey: "ImageKey") -> int:
+        """The row of an image.
+
+        Raises:
+            KeyError: the image is not in the store.
+        """
+        row = imageKey - self._firstKey
+        if not 0 <= row < len(self._paths):
+            raise KeyError(imageKey)
+        return row
+
+    def imageAt(self, row: int) -> "Image":
+        return Image(self, row)
+
+    def add(
+        self,
+        imageKey: "ImageKey",
+        name: str,
+        path: str,
+        downloadPath: Optional[str] = None,
+        downloadTime: Optional[datetime] = None,
+        size: Optional[int] = None,
+        mtime: Optional[float] = None,
+    ) -> "Image":
+        """Add a selected image, or reset it if yet in the store.
+
+        Args:
+            imageKey: the image key, the next key (see nextKey) for a new image.
+            name: the image file name.
+            path: the image full path, ending with its name.
+            downloadPath: the path of the image if previously downloaded.
+            downloadTime: the time of the image download, if previously downloaded.
+            size: the image file size.
+            mtime: the image file modification time.
+
+        Returns:
+            the added image.
+
+        Raises:
+            KeyError: the image key is neither in the store nor the next key.
+        """
+        if not self._paths:
+            self._firstKey = imageKey
+        row = imageKey - self._firstKey
+        if not 0 <= row <= len(self._paths):
+            raise KeyError(imageKey)
+        dirPath = path[:-len(name)] if name else path
+        try:
+            dirIndex = self._dirIds[dirPath]
+        except KeyError:
+            dirIndex = self._dirIds[dirPath] = len(self._dirs)
+            self._dirs.append(dirPath)
+        size = _UNKNOWN if size is None else size
+        mtime = _UNKNOWN if mtime is None else mtime
+
+        if row == len(self._paths):
+            self._paths.append(path)
+            self._dirIndexes.append(dirIndex)
+            self._sizes.append(size)
+            self._mtimes.append(mtime)
+            self._flags.append(SELECTED)
+            if row == len(self._captureTimes):
+                self._growCaptureTimes()
+            self._captureTimes[row] = NO_CAPTURE_TIME
+        else:
+            self._paths[row] = path
+            self._dirIndexes[row] = dirIndex
+            self._sizes[row] = size
+            self._mtimes[row] = mtime
+            self._flags[row] = SELECTED
+            self._captureTimes[row] = NO_CAPTURE_TIME
+            self._sessions.pop(row, None)
+            self._downloads.pop(row, None)
+        if downloadPath is not None:
+            self._downloads[row] = (downloadPath, downloadTime)
+        return Image(self, row)
+
+    def update(self, images: Dict["ImageKey", "Image"]) -> None:
+        """Add copies of images, possibly from another store."""
+        for image in images.values():
+            store, row = image._store, image._row
+            newImage = self.add(
+                image.key, image.name, image.path, image.downloadPath,
+                image.downloadTime, image.size, image.mtime,
+            )
+            newRow = newImage._row
+            self._flags[newRow] = store._flags[row]
+            self._captureTimes[newRow] = store._captureTimes[row]
+            session = store._sessions.get(row)
+            if session:
+                self._sessions[newRow] = session
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def _growCaptureTimes(self) -> None:
+        captureTimes = self._captureTimes
+        grown = np.full(
+            max(_MIN_CAPACITY, 2 * len(captureTimes)), NO_CAPTURE_TIME, dtype=np.int64
+        )
+        grown[:len(captureTimes)] = captureTimes
+        self._captureTimes = grown
+
+
+class Image:
+    """A view on an image of an ImageStore.
+
+    An image is pickled as a copy detached from its store (e.g. when sent to the
+    ImageMover process), in a one image store.
+    """
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store: ImageStore, row: int) -> None:
+        self._store = store
+        self._row = row
+
+    def __reduce__(self):
+        return _detachedImage, (
+            self.key,
+            self.name,
+            self.path,
+            self.downloadPath,
+            self.downloadTime,
+            self.size,
+            self.mtime,
+            self._store._flags[self._row],
+            self.datetime,
+            self.session,
+        )
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Image):
+            return NotImplemented
+        return self._store is other._store and self._row == other._row
+
+    def __hash__(self) -> int:
+        return hash((id(self._store), self._row))
+
+    def __repr__(self) -> str:
+        return f"Image(key={self.key}, name={self.name!r}, path={self.path!r})"
+
+    @property
+    def row(self) -> int:
+        return self._row
+
+    @property
+    def key(self) -> "ImageKey":
+        return self._store._firstKey + self._row
+
+    @property
+    def path(self) -> str:
+        return self._store._paths[self._row]
+
+    @property
+    def name(self) -> str:
+        store = self._store
+        row = self._row
+        return store._paths[row][len(store._dirs[store._dirIndexes[row]]):]
+
+    @property
+    def extension(self) -> str:
+        return os.path.splitext(self.name)[1]
+
+    @property
+    def stem(self) -> str:
+        return os.path.splitext(self.name)[0]
+
+    @property
+    def size(self) -> Optional[int]:
+        size = self._store._sizes[self._row]
+        return None if size == _UNKNOWN else size
+
+    @property
+    def mtime(self) -> Optional[float]:
+        mtime = self._store._mtimes[self._row]
+        return None if mtime == _UNKNOWN else mtime
+
+    @property
+    def downloadPath(self) -> Optional[str]:
+        download = self._store._downloads.get(self._row)
+        return None if download is None else download[0]
+
+    @downloadPath.setter
+    def downloadPath(self, value: Optional[str]) -> None:
+        self._setDownload(value, self.downloadTime)
+
+    @property
+    def downloadTime(self) -> Optional[datetime]:
+        download = self._store._downloads.get(self._row)
+        return None if download is None else download[1]
+
+    @downloadTime.setter
+    def downloadTime(self, value: Optional[datetime]) -> None:
+        self._setDownload(self.downloadPath, value)
+
+    @property
+    def session(self) -> str:
+        return self._store._sessions.get(self._row, "")
+
+    @session.setter
+    def session(self, value: str) -> None:
+        if value:
+            self._store._sessions[self._row] = value
+        else:
+            self._store._sessions.pop(self._row, None)
+
+    @property
+    def isSelected(self) -> bool:
+        return self._getFlag(SELECTED)
+
+    @isSelected.setter
+    def isSelected(self, value: bool) -> None:
+        self._setFlag(SELECTED, value)
+
+    @property
+    def isPreviouslyDownloaded(self) -> bool:
+        return self._getFlag(PREVIOUSLY_DOWNLOADED)
+
+    @isPreviouslyDownloaded.setter
+    def isPreviouslyDownloaded(self, value: bool) -> None:
+        self._setFlag(PREVIOUSLY_DOWNLOADED, value)
+
+    @property
+    def loadingInProgress(self) -> bool:
+        return self._getFlag(LOADING)
+
+    @loadingInProgress.setter
+    def loadingInProgress(self, value: bool) -> None:
+        self._setFlag(LOADING, value)
+
+    @property
+    def thumbnailLoadingInProgress(self) -> bool:
+        return self._getFlag(THUMBNAIL_LOADING)
+
+    @thumbnailLoadingInProgress.setter
+    def thumbnailLoadingInProgress(self, value: bool) -> None:
+        self._setFlag(THUMBNAIL_LOADING, value)
+
+    def _getFlag(self, flag: int) -> bool:
+        return bool(self._store._flags[self._row] & flag)
+
+    def _setFlag(self, flag: int, value: bool) -> None:
+        store = self._store
+        with store._flagsLock:
+            if value:
+                store._flags[self._row] |= flag
+            else:
+                store._flags[self._row] &= ~flag & 0xFF
+
+    def _setDownload(
+        self, downloadPath: Optional[str], downloadTime: Optional[datetime]
+    ) -> None:
+        downloads = self._store._downloads
+        if downloadPath is None and downloadTime is None:
+            downloads.pop(self._row, None)
+        else:
+            downloads[self._row] = (downloadPath, downloadTime)
+
+    @property
+    def captureTime(self) -> Optional[datetime]:
+        captureTime = self._store._captureTimes[self._row]
+        if captureTime == NO_CAPTURE_TIME:
+            return None
+        return EPOCH + timedelta(seconds=int(captureTime))
+
+    @property
+    def isLoaded(self) -> bool:
+        return self._store._captureTimes[self._row] != NO_CAPTURE_TIME
+
+    # Defined last, not to shadow the datetime class in the annotations above.
+    @property
+    def datetime(self) -> Optional[Datation]:
+        d = self.captureTime
+        if d is None:
+            return None
+        return Datation(
+            f"{d.year:04d}", f"{d.month:02d}", f"{d.day:02d}",
+            f"{d.hour:02d}", f"{d.minute:02d}", f"{d.second:02d}",
+        )
+
+    @datetime.setter
+    def datetime(self, value: Optional[Datation]) -> None:
+        if value is None:
+            captureTime = NO_CAPTURE_TIME
+        else:
+            try:
+                captureTime = toCaptureTime(value.asDatetime())
+            except ValueError:
+                # Not a valid date (e.g. a zeroed exif date): use the epoch, as for
+                # the images without exif date.
+                captureTime = 0
+        self._store._captureTimes[self._row] = captureTime
+
+
+def _detachedImage(
+    imageKey: "ImageKey",
+    name: str,
+    path: str,
+    downloadPath: Optional[str],
+    downloadTime: Optional[datetime],
+    size: Optional[int],
+    mtime: Optional[float],
+    flags: int,
+    datetime_: Optional[Datation],
+    session: str,
+) -> Image:
+    """Unpickle an image in its own store."""
+    image = ImageStore().add(
+        imageKey, name, path, downloadPath, downloadTime, size, mtime
+    )
+    image._store._flags[0] = flags
+    image.datetime = datetime_
+    image.session = session
+    return image
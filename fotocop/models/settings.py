@@ -40,6 +40,19 @@ class FotocopSettings(settings.Settings):
         windowSize: the last Fotocop application windows size.
         qtScaleFactor: A magnifying factor to increase the Fotocop application
             lisibility
+        pipelinedExif: if True, the images' scanner process requests the exif of
+            the found images directly to the exif loader process, so that the
+            timeline is built while scanning.
+        exifBatchSize: the number of images whose exif are loaded by one exiftool
+            call while building the timeline.
+        exifToolsCount: the number of exiftool processes loading the images' exif
+            in parallel.
+        fastTimeline: if True, the timeline is built from the images' date only and
+            the thumbnails are loaded on demand, when displayed.
+        timelineBatchSize: the number of images whose date are loaded by one
+            exiftool call in fast timeline mode.
+        thumbnailCacheSize: the memory budget, in megabytes, of the source's
+            rendered thumbnails kept in memory.
 
     Attributes:
         appDirs: A WinAppDirs NamedTuple containing the user app
@@ -68,6 +81,14 @@ class FotocopSettings(settings.Settings):
     windowPosition: Setting = settings.Setting(defaultValue=(0, 0))
     windowSize: Setting = settings.Setting(defaultValue=(1600, 800))
     qtScaleFactor: Setting = settings.Setting(defaultValue="1.0")
+    pipelinedExif: Setting = settings.Setting(defaultValue=False)
+    exifBatchSize: Setting = settings.Setting(defaultValue=50)
+    exifToolsCount: Setting = settings.Setting(
+        defaultValue=max(1, min(4, (os.cpu_count() or 1) // 2))
+    )
+    fastTimeline: Setting = settings.Setting(defaultValue=True)
+    timelineBatchSize: Setting = settings.Setting(defaultValue=500)
+    thumbnailCacheSize: Setting = settings.Setting(defaultValue=512)
 
     def __init__(self, appName: str) -> None:
         # Retrieve or create the user directories for the application.
@@ -88,7 +109,9 @@ def __repr__(self) -> str:
             f"FotocopSettings({self.lastSource}, {self.lastDestination}, "
             f"{self.lastImageNamingTemplate}, {self.lastDestinationNamingTemplate}, "
             f"{self.lastNamingExtension}, {self.logLevel}, {self.windowPosition}, "
-            f"{self.windowSize}, {self.qtScaleFactor})"
+            f"{self.windowSize}, {self.qtScaleFactor}, {self.pipelinedExif}, "
+            f"{self.exifBatchSize}, {self.exifToolsCount}, {self.fastTimeline}, "
+            f"{self.timelineBatchSize}, {self.thumbnailCacheSize})"
         )
 
     def resetToDefaults(self) -> None:
@@ -9,24 +9,43 @@
 
 """
 import logging
+import time
+import threading
+import multiprocessing as mp
 
-from typing import Optional, Tuple, List, Dict, NamedTuple, Any, Iterator
+from typing import TYPE_CHECKING, Optional, Tuple, List, Dict, NamedTuple, Any, Iterator
 from dataclasses import dataclass
 from enum import IntEnum, Enum, auto
 from datetime import datetime
 from pathlib import Path
 
+import numpy as np
 import wmi
 
-from fotocop.util.cache import LRUCache
+from fotocop.util.cache import MeteredLRUCache
 from fotocop.util import qtutil as QtUtil
 from fotocop.util.threadutil import StoppableThread
 from fotocop.util.basicpatterns import Singleton
 from fotocop.models import settings as Config
-from fotocop.models.timeline import Timeline
+from fotocop.models.timeline import Timeline, TimeRange
 from fotocop.models.workerproxy import ImageScanner, ExifLoader
+from fotocop.models.exifloader import (
+    Priority,
+    RenderedThumbnail,
+    RENDERED_THUMBNAIL_WIDTH,
+)
+from fotocop.models.imagestore import (
+    ImageStore,
+    Image,
+    Datation,
+    toCaptureTime,
+    NO_CAPTURE_TIME,
+)
 from fotocop.models.sqlpersistence import DownloadedDB
 
+if TYPE_CHECKING:
+    from fotocop.models.imagescanner import ImagesBatch
+
 __all__ = [
     "MediaType",
     "DriveType",
@@ -43,11 +62,15 @@
 
 logger = logging.getLogger(__name__)
 
-ImageKey = str
+# An image integer id, given by the images' scanner and unique in a source. The
+# image path is only looked up to access its file.
+ImageKey = int
 
 
 def _makeDefaultImageSample() -> "Image":
-    imageSample = Image("IMG_0001.RAF", "L:/path/to/images")
+    imageSample = ImageStore().add(
+        0, "IMG_0001.RAF", "L:/path/to/images/IMG_0001.RAF"
+    )
     d = datetime.today()
     imageSample.datetime = Datation(
         str(d.year), str(d.month), str(d.day), str(d.hour), str(d.minute), str(d.second)
@@ -55,6 +78,14 @@ def _makeDefaultImageSample() -> "Image":
     return imageSample
 
 
+def _thumbnailSize(thumbnail: Tuple[Any, float, int]) -> int:
+    """The size in bytes of a cached thumbnail: its RGB32 pixels or JPEG data."""
+    imgdata = thumbnail[0]
+    if isinstance(imgdata, RenderedThumbnail):
+        return len(imgdata.pixels)
+    return len(imgdata)
+
+
 class MediaType(Enum):
     DEVICE = auto()
     LOGICAL_DISK = auto()
@@ -104,7 +135,9 @@ class Device(Media):
 
 class Source:
 
-    THUMBNAIL_CACHE_SIZE = 10000
+    # The estimated size of a rendered thumbnail until some are cached: a 3:2 image
+    # in RGB32.
+    THUMBNAIL_SIZE_ESTIMATE = RENDERED_THUMBNAIL_WIDTH**2 * 8 // 3
 
     media: Optional[Media]
     eject: bool
@@ -114,10 +147,13 @@ class Source:
     def __init__(self, media: Optional[Media] = None) -> None:
         self.media = media
 
-        self._images: Dict["ImageKey", "Image"] = dict()
+        self._images: "ImageStore" = ImageStore()
         self.imageSample: "Image" = _makeDefaultImageSample()
         self.timeline: "Timeline" = Timeline()
-        self._thumbnailCache: "LRUCache" = LRUCache(Source.THUMBNAIL_CACHE_SIZE)
+        self._thumbnailCache: "MeteredLRUCache" = MeteredLRUCache(
+            Config.fotocopSettings.thumbnailCacheSize * 1024 * 1024,
+            getsizeof=_thumbnailSize,
+        )
 
         self.selectedImagesCount: int = 0
 
@@ -126,6 +162,28 @@ def __init__(self, media: Optional[Media] = None) -> None:
 
         self.timelineBuilt: bool = False
 
+        # In pipelined exif mode, the exif of an image may be received before its
+        # batch: they are kept until the image is received.
+        self.exifPipelined: bool = False
+        self._earlyDatetimes: Dict["ImageKey", Tuple[str, ...]] = dict()
+        self._earlyThumbnails: Dict["ImageKey", Tuple[bytes, float, int]] = dict()
+        # Images' batches and exif are received from two listener threads.
+        self._lock = threading.RLock()
+
+        # Tags the exif requests of the source, so that the ExifLoader drops the
+        # ones of a previous source (see SourceManager._cancelExifLoading).
+        self.exifGeneration: int = 0
+
+        # Time-to-first-thumbnail measurement, from the scan start.
+        self.scanStartTime: Optional[float] = None
+        self._firstThumbnailReceived: bool = False
+
+        # The images' time ranges filter (see isInTimeRanges): the merged ranges
+        # bounds and the images mask, by row.
+        self._timeRanges: Optional[List[TimeRange]] = None
+        self._timeRangesBounds = np.empty(0, dtype=np.int64)
+        self._timeRangesMask = np.empty(0, dtype=bool)
+
     @classmethod
     def fromDevice(cls, device: Device, eject: bool = False):
         s = cls(device)
@@ -164,6 +222,10 @@ def path(self) -> str:
         else:
             return ""
 
+    @property
+    def receivedExifCount(self) -> int:
+        return self._receivedExifCount
+
     @property
     def imageKeys(self) -> Iterator["ImageKey"]:
         return (imageKey for imageKey in self._images.keys())
@@ -210,15 +272,17 @@ def getImageProperty(self, imageKey: "ImageKey", pty: "ImageProperty") -> Any:
     def _getImageDatetime(self, imageKey: "ImageKey") -> Optional[datetime]:
         image = self._images[imageKey]
         name = image.name
-        datetime_ = image.datetime
+        captureTime = image.captureTime
 
-        if datetime_ is not None:
-            return datetime_.asDatetime()
+        if captureTime is not None:
+            return captureTime
 
         if not image.loadingInProgress:
             logger.debug(f"Datetime cache missed for image: {name}")
             image.loadingInProgress = True  # noqa
-            SourceManager().exifLoader.loadDatetime(imageKey)
+            SourceManager().exifLoader.loadDatetime(
+                imageKey, image.path, self.exifGeneration
+            )
         else:
             logger.debug(f"Loading in progress: {name}")
         return None
@@ -229,14 +293,17 @@ def _getImageThumbnail(self, imageKey: "ImageKey") -> Tuple[bytes, float, int]:
         try:
             imgdata, aspectRatio, orientation = self._thumbnailCache[imageKey]
         except KeyError:
-            if not image.loadingInProgress:
+            if not image.thumbnailLoadingInProgress:
                 logger.debug(f"Thumbnail cache missed for image: {name}")
-                image.loadingInProgress = True  # noqa
-                # Load date/time only if not yet loaded to avoid double count in the timeline
-                if image.datetime is None:
-                    SourceManager().exifLoader.loadAll(imageKey)
+                image.thumbnailLoadingInProgress = True  # noqa
+                # Load date/time only if not yet loaded nor requested to avoid double
+                # count in the timeline
+                exifLoader = SourceManager().exifLoader
+                if not image.isLoaded and not image.loadingInProgress:
+                    image.loadingInProgress = True  # noqa
+                    exifLoader.loadAll(imageKey, image.path, self.exifGeneration)
                 else:
-                    SourceManager().exifLoader.loadThumbnail(imageKey)
+                    exifLoader.loadThumbnail(imageKey, image.path, self.exifGeneration)
             else:
                 logger.debug(f"Loading in progress: {name}")
             return b"loading", 0.0, 0
@@ -244,25 +311,72 @@ def _getImageThumbnail(self, imageKey: "ImageKey") -> Tuple[bytes, float, int]:
             logger.debug(f"Got image: {name} {aspectRatio} {orientation} from cache")
             return imgdata, aspectRatio, orientation
 
-    def receiveImages(
-        self, batch: int, images: List[Tuple[str, "ImageKey", str, datetime]]
-    ):
-        currentPath = self.path
+    def prioritizeExif(
+        self, visibleKeys: List["ImageKey"], nearKeys: List["ImageKey"]
+    ) -> None:
+        """Load first the exif of the visible images, then of the ones about to
+        become visible, as the thumbnails view is scrolled.
+
+        The thumbnails of the images about to become visible are prefetched.
+        """
+        exifLoader = SourceManager().exifLoader
+        exifLoader.prioritize(visibleKeys, nearKeys)
+
+        prefetchedImages = list()
+        for imageKey in nearKeys:
+            image = self._images.get(imageKey)
+            if (
+                image is None
+                or image.thumbnailLoadingInProgress
+                or imageKey in self._thumbnailCache
+            ):
+                continue
+            image.thumbnailLoadingInProgress = True
+            prefetchedImages.append((imageKey, image.path))
+        if prefetchedImages:
+            exifLoader.loadAllBatch(
+                prefetchedImages, self.exifGeneration, Priority.NEAR
+            )
+
+    def receiveImages(self, batch: int, images: "ImagesBatch"):
+        if not images.root.startswith(self.path):
+            # source has been reset or has changed: ignore old data
+            logger.debug(f"Batch {batch} is not found in current source selection")
+            return
+
+        start = time.perf_counter()
         newImages = dict()
         deselImageKeys = list()
         deselCount = 0
-        for name, imageKey, downloadPath, downloadTime in images:
-            if imageKey.startswith(currentPath):
-                image = Image(name, imageKey, downloadPath, downloadTime)
-                if downloadPath is not None:
+        exifPipelined = self.exifPipelined
+        with self._lock:
+            if images.generation != self.exifGeneration:
+                # Batch of an aborted scan: its image keys are not the source ones
+                logger.debug(f"Batch {batch} is from a previous scan")
+                return
+            if images.firstKey != self._images.nextKey:
+                # Batch of a previous scan of the source path: ignore old data
+                logger.debug(f"Batch {batch} is not the next one of the source")
+                return
+            addImage = self._images.add
+            for imageKey, name, path, size, mtime, dPath, dTime in images:
+                image = addImage(imageKey, name, path, dPath, dTime, size, mtime)
+                # The exif of the image is yet requested by the images' scanner
+                image.loadingInProgress = exifPipelined
+                if dPath is not None:
                     image.isPreviouslyDownloaded = True
                     image.isSelected = False
                     deselImageKeys.append(imageKey)
                     deselCount += 1
                 newImages[imageKey] = image
+        logger.debug(
+            f"Decoded batch: {batch} in {(time.perf_counter() - start) * 1000:.1f} ms"
+        )
 
         if newImages:
-            self._images.update(newImages)
+            with self._lock:
+                earlyDatetimes = self._popEarlyExif(self._earlyDatetimes, newImages)
+                earlyThumbnails = self._popEarlyExif(self._earlyThumbnails, newImages)
             # New images are selected except if previously downloaded
             imagesCount = len(newImages)
             self.selectedImagesCount += imagesCount - deselCount
@@ -274,61 +388,200 @@ def receiveImages(
             SourceManager().imagesInfoChanged.emit(
                 deselImageKeys, ImageProperty.IS_SELECTED, False
             )
+            for imageKey, datetime_ in earlyDatetimes:
+                self.receiveDatetime(imageKey, datetime_)
+            for imageKey, thumbnail in earlyThumbnails:
+                self.receiveThumbnail(imageKey, thumbnail)
+
+    @staticmethod
+    def _popEarlyExif(
+        earlyExif: Dict["ImageKey", Any], newImages: Dict["ImageKey", "Image"]
+    ) -> List[Tuple["ImageKey", Any]]:
+        return [
+            (imageKey, earlyExif.pop(imageKey))
+            for imageKey in list(earlyExif)
+            if imageKey in newImages
+        ]
+
+    def _isEarlyExif(self, imageKey: "ImageKey") -> bool:
+        # An exif received in pipelined mode for an image of this source not yet
+        # received.
+        return self.exifPipelined and imageKey >= self._images.nextKey
 
     def receiveDatetime(
         self, imageKey: "ImageKey", datetime_: Tuple[str, str, str, str, str, str]
     ):
-        images = self._images
-        try:
-            image = images[imageKey]
-        except KeyError:
-            # source has been reset or has changed: ignore old data
-            logger.debug(f"{imageKey} is not found in current source selection")
-        else:
+        with self._lock:
+            try:
+                image = self._images[imageKey]
+            except KeyError:
+                if self._isEarlyExif(imageKey):
+                    self._earlyDatetimes[imageKey] = datetime_
+                else:
+                    # source has been reset or has changed: ignore old data
+                    logger.debug(
+                        f"{imageKey} is not found in current source selection"
+                    )
+                return
+            if image.isLoaded:
+                # Received twice (e.g. requested for a previous source): do not
+                # count it again in the timeline.
+                logger.debug(f"Datetime yet received for image {imageKey}")
+                return
+
             sourceManager = SourceManager()
+            self._receivedExifCount += 1
             receivedExifCount = self._receivedExifCount
             imagesCount = self.imagesCount
-            receivedExifCount += 1
             logger.debug(
                 f"Received datetime for image {imageKey} "
                 f"({receivedExifCount}/{imagesCount})"
             )
-            image.datetime = Datation(*datetime_)
+            datation = Datation(*datetime_)
+            image.datetime = datation
             image.loadingInProgress = False
+            row = image.row
+            if row < len(self._timeRangesMask):
+                self._timeRangesMask[row] = self._inTimeRanges(
+                    self._images.captureTimes[row:row + 1]
+                )[0]
             self.timeline.addDatetime(datetime_)
-            sourceManager.backgroundActionProgressChanged.emit(receivedExifCount)
-            if 0 < imagesCount == receivedExifCount:
-                self.imageSample = imageSample = images[next(iter(images))]
-                logger.debug(
-                    f"Image sample is now: {imageSample.name} "
-                    f"in {imageSample.path} "
-                    f"with date {imageSample.datetime}"
-                )
-                logger.info(
-                    f"Received exif for {receivedExifCount} images: Timeline built"
-                )
-                sourceManager.backgroundActionCompleted.emit("Timeline built!")
-                receivedExifCount = 0
-                self.timelineBuilt = True  # noqa
-                sourceManager.timelineBuilt.emit()
-                sourceManager.imageSampleChanged.emit()
-                sourceManager._buildTimelineInProgress = False
+            if imagesCount > 0:
+                sourceManager.backgroundActionProgressChanged.emit(receivedExifCount)
+            self.checkTimelineBuilt()
             sourceManager.imagesInfoChanged.emit(
-                [imageKey], ImageProperty.DATETIME, image.datetime
+                [imageKey], ImageProperty.DATETIME, datation
+            )
+
+    def isInTimeRanges(self, imageKey: "ImageKey", timeRanges: List[TimeRange]) -> bool:
+        """Whether the image capture time is in one of the time ranges.
+
+        The images are filtered at once: a mask of all images is computed for each
+        new time ranges list, then updated as the images' capture time is received.
+        Images whose capture time is not loaded yet are in the ranges.
+        """
+        with self._lock:
+            row = self._images.rowOf(imageKey)
+            if timeRanges is not self._timeRanges or row >= len(self._timeRangesMask):
+                if timeRanges is not self._timeRanges:
+                    self._timeRanges = timeRanges
+                    self._timeRangesBounds = self._mergeTimeRanges(timeRanges)
+                self._timeRangesMask = self._inTimeRanges(self._images.captureTimes)
+            return bool(self._timeRangesMask[row])
+
+    def _inTimeRanges(self, captureTimes: np.ndarray) -> np.ndarray:
+        # The merged ranges bounds are sorted [start, end) pairs: a capture time is
+        # in a range when an odd number of bounds are lower or equal to it.
+        inRanges = np.searchsorted(self._timeRangesBounds, captureTimes, side="right")
+        return (inRanges & 1).astype(bool) | (captureTimes == NO_CAPTURE_TIME)
+
+    @staticmethod
+    def _mergeTimeRanges(timeRanges: List[TimeRange]) -> np.ndarray:
+        """Merge the overlapping time ranges, as a sorted array of [start, end)
+        capture times bounds.
+        """
+        ranges = list()
+        for timeRange in timeRanges:
+            # Capture times are whole seconds and the time range end is included.
+            start = toCaptureTime(timeRange.start)
+            if timeRange.start.microsecond:
+                start += 1
+            ranges.append((start, toCaptureTime(timeRange.end) + 1))
+        ranges.sort()
+        bounds = list()
+        for start, end in ranges:
+            if bounds and start <= bounds[-1]:
+                bounds[-1] = max(bounds[-1], end)
+            elif start < end:
+                bounds.extend((start, end))
+        return np.array(bounds, dtype=np.int64)
+
+    def thumbnailsCapacity(self) -> int:
+        """The number of thumbnails still fitting in the thumbnail cache budget.
+
+        The thumbnails size is estimated from the mean size of the cached ones.
+        """
+        cache = self._thumbnailCache
+        count = len(cache)
+        currsize = cache.currsize
+        meanSize = currsize / count if currsize else Source.THUMBNAIL_SIZE_ESTIMATE
+        return max(0, int((cache.maxsize - currsize) // meanSize))
+
+    def receiveDatetimes(
+        self,
+        generation: int,
+        datetimes: List[Tuple["ImageKey", Tuple[str, str, str, str, str, str]]],
+    ):
+        if generation != self.exifGeneration:
+            # Loaded for a previous source: its image keys are not the source ones
+            logger.debug(f"Drop {len(datetimes)} datetimes of old generation")
+            return
+        for imageKey, datetime_ in datetimes:
+            self.receiveDatetime(imageKey, datetime_)
+
+    def checkTimelineBuilt(self) -> None:
+        """Complete the timeline building once all images' datetime are received.
+
+        In pipelined exif mode, all datetime may be received before the images
+        count is known: the check is also done when the scan completes.
+        """
+        with self._lock:
+            images = self._images
+            receivedExifCount = self._receivedExifCount
+            if self.timelineBuilt or not 0 < self.imagesCount == receivedExifCount:
+                return
+            sourceManager = SourceManager()
+            self.imageSample = imageSample = images[next(iter(images))]
+            logger.debug(
+                f"Image sample is now: {imageSample.name} "
+                f"in {imageSample.path} "
+                f"with date {imageSample.datetime}"
+            )
+            logger.info(
+                f"Received exif for {receivedExifCount} images: Timeline built"
             )
-            self._receivedExifCount = receivedExifCount  # noqa
+            logger.info(f"Thumbnail cache: {self._thumbnailCache.metrics}")
+            sourceManager.backgroundActionCompleted.emit("Timeline built!")
+            self._receivedExifCount = 0
+            self.timelineBuilt = True  # noqa
+            sourceManager.timelineBuilt.emit()
+            sourceManager.imageSampleChanged.emit()
+            sourceManager._buildTimelineInProgress = False
 
     def receiveThumbnail(self, imageKey: "ImageKey", thumbnail):
-        try:
-            image = self._images[imageKey]
-        except KeyError:
-            # source has been reset or has changed: ignore old data
-            logger.debug(f"{imageKey} is not found in current source selection")
-        else:
-            logger.debug(f"Received thumbnail for image {imageKey}")
-            self._thumbnailCache[imageKey] = thumbnail
-            image.loadingInProgress = False
-            SourceManager().thumbnailLoaded.emit(imageKey)
+        with self._lock:
+            try:
+                image = self._images[imageKey]
+            except KeyError:
+                if self._isEarlyExif(imageKey):
+                    self._earlyThumbnails[imageKey] = thumbnail
+                else:
+                    # source has been reset or has changed: ignore old data
+                    logger.debug(
+                        f"{imageKey} is not found in current source selection"
+                    )
+                return
+
+        logger.debug(f"Received thumbnail for image {imageKey}")
+        if not self._firstThumbnailReceived and self.scanStartTime is not None:
+            self._firstThumbnailReceived = True
+            logger.info(
+                f"First thumbnail received "
+                f"{time.perf_counter() - self.scanStartTime:.3f} s after scan start"
+            )
+        self._thumbnailCache[imageKey] = thumbnail
+        image.thumbnailLoadingInProgress = False
+        SourceManager().thumbnailLoaded.emit(imageKey)
+
+    def receiveThumbnails(
+        self, generation: int, thumbnails: List[Tuple["ImageKey", Any]]
+    ):
+        if generation != self.exifGeneration:
+            # Loaded for a previous source: its image keys are not the source ones
+            logger.debug(f"Drop {len(thumbnails)} thumbnails of old generation")
+            return
+        for imageKey, thumbnail in thumbnails:
+            self.receiveThumbnail(imageKey, thumbnail)
 
     def markImagesAsSelected(self, imageKeys: List["ImageKey"], value: bool) -> None:
         changed = list()
@@ -386,9 +639,12 @@ def markImagesAsPreviouslyDownloaded(
                 image.downloadPath = downloadPath.as_posix()
                 image.downloadTime = downloadTime
                 name = image.name
-                stat = Path(image.path).stat()
-                size = stat.st_size
-                mtime = stat.st_mtime
+                size = image.size
+                mtime = image.mtime
+                if size is None or mtime is None:
+                    stat = Path(image.path).stat()
+                    size = stat.st_size
+                    mtime = stat.st_mtime
                 records.append(
                     (name, size, mtime, downloadPath.as_posix(), downloadTime)
                 )
@@ -401,49 +657,12 @@ def markImagesAsPreviouslyDownloaded(
             )
 
 
-class Datation(NamedTuple):
-    year: str
-    month: str
-    day: str
-    hour: str
-    minute: str
-    second: str
-
-    def asDatetime(self) -> datetime:
-        return datetime(*[int(s) for s in self])
-
-
 class DownloadInfo(NamedTuple):
     isPreviouslyDownloaded: bool
     downloadPath: Optional[str]
     downloadTime: Optional[datetime]
 
 
-@dataclass()
-class Image:
-    name: str
-    path: str
-    downloadPath: str = None
-    downloadTime: datetime = None
-
-    def __post_init__(self):
-        self.extension: str = Path(self.name).suffix
-        self.stem: str = Path(self.name).stem
-        self.isPreviouslyDownloaded: bool = False
-        self.isSelected: bool = True
-        self.datetime: Optional[Datation] = None
-        self.session: str = ""
-        self.loadingInProgress: bool = False
-
-    @property
-    def key(self) -> "ImageKey":
-        return self.path
-
-    @property
-    def isLoaded(self) -> bool:
-        return self.datetime is not None
-
-
 class ExifRequestor(StoppableThread):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -463,8 +682,24 @@ def requestExif(self):
         sourceManager.backgroundActionStarted.emit(
             f"Building timeline for {imagesCount} images...", imagesCount
         )
+        exifLoader = sourceManager.exifLoader
+        generation = source.exifGeneration
+        settings = Config.fotocopSettings
+        if settings.fastTimeline:
+            # Build the whole timeline from the images' date only, by large batches:
+            # thumbnails are loaded on demand by the thumbnails view.
+            thumbnailsLimit = 0
+            datetimeBatchSize = settings.timelineBatchSize
+        else:
+            thumbnailsLimit = source.thumbnailsCapacity()
+            datetimeBatchSize = settings.exifBatchSize
+        batchSize = settings.exifBatchSize
         requestedExifCount = 0
+        requestedThumbnailCount = 0
         stopped = False
+        # Exif are requested by batches of images, each loaded by one exiftool call.
+        loadAllBatch = list()
+        loadDatetimeBatch = list()
         for image in source.images:
             if self.stopped():
                 logger.info(f"Stop requesting exif for {source.path}")
@@ -473,17 +708,47 @@ def requestExif(self):
             if not image.isLoaded and not image.loadingInProgress:
                 image.loadingInProgress = True
                 requestedExifCount += 1
-                if requestedExifCount < Source.THUMBNAIL_CACHE_SIZE:
-                    # Load both datetime and thumbnail while the thumbnails cache is not full.
-                    sourceManager.exifLoader.loadAll(image.key)
+                if (
+                    requestedThumbnailCount < thumbnailsLimit
+                    and not image.thumbnailLoadingInProgress
+                ):
+                    # Load both datetime and thumbnail while the thumbnails fit in
+                    # the thumbnail cache budget.
+                    image.thumbnailLoadingInProgress = True
+                    requestedThumbnailCount += 1
+                    loadAllBatch.append(image)
+                    if len(loadAllBatch) >= batchSize:
+                        exifLoader.loadAllBatch(
+                            [(i.key, i.path) for i in loadAllBatch], generation
+                        )
+                        loadAllBatch = list()
                 else:
-                    # Load only datetime once the thumbnails cache is full.
-                    sourceManager.exifLoader.loadDatetime(image.key)
+                    # Load only datetime once the thumbnail cache budget is spent.
+                    loadDatetimeBatch.append(image)
+                    if len(loadDatetimeBatch) >= datetimeBatchSize:
+                        exifLoader.loadDatetimeBatch(
+                            [(i.key, i.path) for i in loadDatetimeBatch], generation
+                        )
+                        loadDatetimeBatch = list()
             else:
                 logger.debug(
                     f"Datetime yet loaded or in progress for {image.name}: skipped"
                 )
-        if not stopped:
+        if stopped:
+            # The images of the pending batches will be requested on demand.
+            for image in loadAllBatch:
+                image.thumbnailLoadingInProgress = False
+            for image in (*loadAllBatch, *loadDatetimeBatch):
+                image.loadingInProgress = False
+        else:
+            if loadAllBatch:
+                exifLoader.loadAllBatch(
+                    [(i.key, i.path) for i in loadAllBatch], generation
+                )
+            if loadDatetimeBatch:
+                exifLoader.loadDatetimeBatch(
+                    [(i.key, i.path) for i in loadDatetimeBatch], generation
+                )
             logger.info(
                 f"{requestedExifCount} exif load requests sent for {source.path}"
             )
@@ -495,7 +760,7 @@ class SourceManager(metaclass=Singleton):
     sourceSelected = QtUtil.QtSignalAdapter(Source)
     imageScanCompleted = QtUtil.QtSignalAdapter(int)  # imagesCount
     imagesBatchLoaded = QtUtil.QtSignalAdapter(dict)  # images
-    thumbnailLoaded = QtUtil.QtSignalAdapter(str)  # name
+    thumbnailLoaded = QtUtil.QtSignalAdapter(int)  # imageKey
     imagesInfoChanged = QtUtil.QtSignalAdapter(
         list, Enum, object
     )  # imageKeys, imageProperty, values
@@ -513,18 +778,30 @@ def __init__(self):
         self._scanInProgress = False
         self._buildTimelineInProgress = False
         self._exifRequestor = None
+        self._exifGeneration = 0
 
         self.downloadedDb = DownloadedDB()
 
+        # In pipelined exif mode, the image scanner process feeds the exif loader
+        # process with the found images through a dedicated queue.
+        self._exifQueue = mp.Queue() if Config.fotocopSettings.pipelinedExif else None
+
         # Start the image scanner process and establish a Pipe connection with it
-        self.imageScanner = ImageScanner(name="ImageScanner")
+        self.imageScanner = ImageScanner("ImageScanner", self._exifQueue)
         self.imageScanner.subscribe("ScanComplete", self.scanComplete)
         self.imageScanner.subscribe("images", self.receiveImages)
 
         # Start the exif loader process and establish a Pipe connection with it
-        self.exifLoader = ExifLoader(name="ExifLoader")
-        self.exifLoader.subscribe("datetime", self.receiveDatetime)
-        self.exifLoader.subscribe("thumbnail", self.receiveThumbnail)
+        settings = Config.fotocopSettings
+        self.exifLoader = ExifLoader(
+            "ExifLoader",
+            self._exifQueue,
+            settings.exifToolsCount,
+            settings.exifBatchSize,
+            settings.timelineBatchSize,
+        )
+        self.exifLoader.subscribe("datetimes", self.receiveDatetimes)
+        self.exifLoader.subscribe("thumbnails", self.receiveThumbnails)
 
     @property
     def devices(self) -> Iterator["Device"]:
@@ -669,11 +946,11 @@ def setDeviceEjectState(self, state: bool):
     def receiveImages(self, *args, **kwargs) -> None:
         self.source.receiveImages(*args, **kwargs)
 
-    def receiveDatetime(self, *args, **kwargs) -> None:
-        self.source.receiveDatetime(*args, **kwargs)
+    def receiveDatetimes(self, *args, **kwargs) -> None:
+        self.source.receiveDatetimes(*args, **kwargs)
 
-    def receiveThumbnail(self, *args, **kwargs) -> None:
-        self.source.receiveThumbnail(*args, **kwargs)
+    def receiveThumbnails(self, *args, **kwargs) -> None:
+        self.source.receiveThumbnails(*args, **kwargs)
 
     def scanComplete(self, imagesCount: int, isStopped: bool):
         # Call by the images' scanner listener when the scan process is finished (either
@@ -688,12 +965,25 @@ def scanComplete(self, imagesCount: int, isStopped: bool):
             # dedicated thread
             self._scanInProgress = False
             self.backgroundActionCompleted.emit(f"Found {imagesCount} images")
-            self.source.imagesCount = imagesCount
+            source = self.source
+            source.imagesCount = imagesCount
             self.imageScanCompleted.emit(imagesCount)
             if imagesCount > 0:
-                self._exifRequestor = ExifRequestor()
-                self._exifRequestor.start()
-                self._buildTimelineInProgress = True
+                if source.exifPipelined:
+                    # Exif are yet requested by the images' scanner and may be all
+                    # received.
+                    self.backgroundActionStarted.emit(
+                        f"Building timeline for {imagesCount} images...", imagesCount
+                    )
+                    self.backgroundActionProgressChanged.emit(
+                        source.receivedExifCount
+                    )
+                    self._buildTimelineInProgress = True
+                    source.checkTimelineBuilt()
+                else:
+                    self._exifRequestor = ExifRequestor()
+                    self._exifRequestor.start()
+                    self._buildTimelineInProgress = True
 
     def close(self):
         # Organize a kindly shutdown when quitting the application
@@ -707,6 +997,11 @@ def close(self):
         # Stop and join the exif loader process ant its listener thread
         self.exifLoader.stop()
 
+        if self._exifQueue is not None:
+            self._exifQueue.close()
+
+        self.downloadedDb.close()
+
     def _autoSourceSelect(self) -> None:
         srcTypeStr, srcName, srcPath, srcSubDirs = Config.fotocopSettings.lastSource
         srcType = MediaType[srcTypeStr]
@@ -744,14 +1039,35 @@ def _scanImages(self) -> None:
         if source.isDevice:
             path = source.media.path
             includeSubDirs = True
+            incremental = False
         elif source.isLogicalDisk:
             path = source.selectedPath
             includeSubDirs = source.subDirs
+            # Rescan only the changed folders, using the last scan manifest, except
+            # on removable media whose folders' modification time may not be updated
+            # by the cameras.
+            incremental = source.media.driveType != DriveType.REMOVABLE
         else:
             return
 
+        source.exifGeneration = self._exifGeneration
+        exifThumbnails = None
+        if self._exifQueue is not None:
+            source.exifPipelined = True
+            # In fast timeline mode, only the images' date are requested.
+            exifThumbnails = source.thumbnailsCapacity()
+            if Config.fotocopSettings.fastTimeline:
+                exifThumbnails = 0
+
         self.backgroundActionStarted.emit(f"Scanning {path} for images...", 0)
-        self.imageScanner.scan(path.as_posix(), includeSubDirs)
+        source.scanStartTime = time.perf_counter()
+        self.imageScanner.scan(
+            path.as_posix(),
+            includeSubDirs,
+            incremental,
+            exifThumbnails,
+            source.exifGeneration,
+        )
         self._scanInProgress = True
 
     def _abortScannning(self):
@@ -762,12 +1078,20 @@ def _abortScannning(self):
             self._scanInProgress = False
 
     def _abortExifLoading(self):
+        self._cancelExifLoading()
         if self._buildTimelineInProgress:
             self.backgroundActionCompleted.emit(f"Timeline building aborted!")
-            self._exifRequestor.stop()
-            self._exifRequestor = None
+            if self._exifRequestor is not None:
+                self._exifRequestor.stop()
+                self._exifRequestor = None
             self._buildTimelineInProgress = False
 
+    def _cancelExifLoading(self) -> None:
+        # Start a new exif generation: the ExifLoader purges its pending requests
+        # and drops the ones still to come for the previous source.
+        self._exifGeneration += 1
+        self.exifLoader.cancel(self._exifGeneration)
+
     def _stopExifRequestor(self):
         exifRequestor = self._exifRequestor
         if exifRequestor and exifRequestor.is_alive():
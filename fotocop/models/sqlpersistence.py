@@ -1,12 +1,32 @@
+import os
 import sqlite3
+import hashlib
 import datetime
 import logging
-from typing import Optional, NamedTuple, Tuple, List
+import threading
+import time
+import functools
+from pathlib import Path
+from typing import Optional, NamedTuple, Tuple, List, Dict, Set, Callable
 
+from fotocop.util.bloomfilter import BloomFilter
 from fotocop.models import settings as Config
 
 SQLITE3_TIMEOUT = 10.0
 SQLITE3_RETRY_ATTEMPTS = 5
+SQLITE3_RETRY_DELAY = 0.05  # First retry delay in seconds, doubled on each attempt
+SQLITE3_CACHE_SIZE = -8192  # Page cache size: negative values are in KiB (8 MiB)
+SQLITE3_CACHED_STATEMENTS = 64
+
+INDEX_MIN_CAPACITY = 100000
+INDEX_ERROR_RATE = 0.01
+INDEX_FETCH_SIZE = 10000
+
+EXIF_CACHE_MAX_ROWS = 200000
+EXIF_CACHE_EVICTION_RATIO = 0.9  # Evict down to 90% of the maximum rows count
+
+THUMBNAIL_CACHE_MAX_BYTES = 512 * 1024 * 1024
+THUMBNAIL_CACHE_EVICTION_RATIO = 0.9  # Evict down to 90% of the bytes budget
 
 
 class FileDownloaded(NamedTuple):
@@ -14,6 +34,155 @@ class FileDownloaded(NamedTuple):
     downloadDatetime: datetime.datetime
 
 
+# A file identity: file name (excluding path), size and modification time.
+FileKey = Tuple[str, int, float]
+
+
+class CachedExif(NamedTuple):
+    """The exif of an image file required by the timeline and thumbnails grid.
+
+    The image geometry (aspect ratio and orientation) and the JPEG thumbnail
+    location in the file are None when not yet loaded.
+    """
+    dateTime: str   # "YYYY:MM:DD HH:MM:SS"
+    aspectRatio: Optional[float] = None
+    orientation: Optional[int] = None
+    thumbnailOffset: Optional[int] = None
+    thumbnailLength: Optional[int] = None
+
+
+class CachedThumbnail(NamedTuple):
+    """An image thumbnail: its JPEG data, aspect ratio and orientation."""
+    data: bytes
+    aspectRatio: float
+    orientation: int
+
+
+def _isBusy(error: sqlite3.OperationalError) -> bool:
+    msg = str(error)
+    return "database is locked" in msg or "database is busy" in msg
+
+
+def retryOnBusy(func: Callable) -> Callable:
+    """Retry a database operation, with an exponential backoff, while busy.
+
+    The operation is attempted at most SQLITE3_RETRY_ATTEMPTS times when sqlite
+    reports a SQLITE_BUSY or SQLITE_LOCKED condition. Other errors, or a busy
+    condition on the last attempt, are raised to the caller.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        delay = SQLITE3_RETRY_DELAY
+        for attempt in range(1, SQLITE3_RETRY_ATTEMPTS + 1):
+            try:
+                return func(*args, **kwargs)
+            except sqlite3.OperationalError as e:
+                if attempt == SQLITE3_RETRY_ATTEMPTS or not _isBusy(e):
+                    raise
+                logging.warning(
+                    f"Database busy in {func.__name__}: {e}. "
+                    f"Retry #{attempt} in {delay:.2f} s..."
+                )
+                time.sleep(delay)
+                delay *= 2
+    return wrapper
+
+
+class ConnectionManager:
+    """
+    Long-lived sqlite3 connections to a database file.
+
+    One connection is opened per process and thread on first use, then reused by
+    all subsequent operations of that thread, so that sqlite can keep its page and
+    prepared statements caches warm. The database is switched to WAL journaling so
+    that readers (e.g. an images scan) never block on a writer (e.g. a download) and
+    conversely.
+
+    Every connection opened by a ConnectionManager is registered, so that all of
+    them, including the ones of worker threads, are closed when it is closed.
+
+    A ConnectionManager can be pickled to be sent to a child process: connections
+    are not transferred and the child process opens its own ones.
+    """
+
+    def __init__(self, db: Path) -> None:
+        self._db = db
+        self._initLocalState()
+
+    def __getstate__(self):
+        return {"_db": self._db}
+
+    def __setstate__(self, state) -> None:
+        self._db = state["_db"]
+        self._initLocalState()
+
+    def _initLocalState(self) -> None:
+        self._local = threading.local()
+        self._connections: Set[sqlite3.Connection] = set()
+        self._connectionsLock = threading.Lock()
+        self._pid = os.getpid()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """The connection of the calling process and thread."""
+        local = self._local
+        pid = os.getpid()
+        conn = getattr(local, "connection", None)
+        if conn is None or local.pid != pid or conn not in self._connections:
+            conn = self._connect()
+            with self._connectionsLock:
+                if self._pid != pid:
+                    # Forked: the parent process connections are not ours.
+                    self._connections = set()
+                    self._pid = pid
+                self._connections.add(conn)
+            local.connection = conn
+            local.pid = pid
+        return conn
+
+    def close(self) -> None:
+        """Close the connections opened by all threads of the calling process.
+
+        The threads must not use their connection anymore: a new one is opened
+        on their next operation.
+        """
+        with self._connectionsLock:
+            if self._pid != os.getpid():
+                return
+            connections = self._connections
+            self._connections = set()
+        for conn in connections:
+            conn.close()
+        if connections:
+            logging.debug(
+                f"Closed {len(connections)} connections to {self._db} "
+                f"in process {os.getpid()}"
+            )
+        self._local.connection = None
+
+    @retryOnBusy
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self._db,
+            timeout=SQLITE3_TIMEOUT,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            cached_statements=SQLITE3_CACHED_STATEMENTS,
+            # Used by its thread only, but closed by the one closing the manager.
+            check_same_thread=False,
+        )
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            # In WAL mode, NORMAL is durable except on power loss and avoids a fsync
+            # per transaction.
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA cache_size={SQLITE3_CACHE_SIZE}")
+        except sqlite3.OperationalError:
+            conn.close()
+            raise
+        logging.debug(f"Connected to {self._db} in process {os.getpid()}")
+        return conn
+
+
 class DownloadedDB:
     """
     Previous image file download detection.
@@ -21,14 +190,111 @@ class DownloadedDB:
     Used to detect if an image file has been downloaded before. A file is the same if
     the file name (excluding path), size and modification time are the same.
     For performance reasons, Exif information is never checked.
+
+    An optional in-process index of the (file_name, size, mtime) keys, built by
+    loadIndex(), answers the lookups of never downloaded files without querying the
+    database: only the possibly downloaded files are then looked up in sqlite.
     """
 
-    def __init__(self) -> None:
-        settings = Config.fotocopSettings
-        self._db = settings.appDirs.user_data_dir / "downloaded_images.sqlite"
-        self._tableName = "downloaded"
+    def __init__(self, db: Optional[Path] = None) -> None:
+        if db is None:
+            settings = Config.fotocopSettings
+            db = settings.appDirs.user_data_dir / "downloaded_images.sqlite"
+        self._db = db
+        self._connections = ConnectionManager(db)
+        self._tableName = tableName = "downloaded"
+
+        # SQL statements are built once so that each connection prepares them once.
+        self._insertSql = (
+            f"""INSERT OR REPLACE INTO {tableName} (file_name, size, mtime,
+                download_name, download_datetime) VALUES (?,?,?,?,?)
+            """
+        )
+        self._selectSql = (
+            f"""SELECT download_name, download_datetime as [timestamp]
+                FROM {tableName} WHERE file_name=? AND size=? AND mtime=?
+            """
+        )
+        self._indexSql = (
+            f"""SELECT rowid, file_name, size, mtime FROM {tableName}
+                WHERE rowid > ? ORDER BY rowid
+            """
+        )
+        self._joinSql = (
+            f"""SELECT d.file_name, d.size, d.mtime, d.download_name,
+                d.download_datetime as [timestamp]
+                FROM temp.lookup l JOIN {tableName} d
+                ON d.file_name=l.file_name AND d.size=l.size AND d.mtime=l.mtime
+            """
+        )
+
+        self._index: Optional[BloomFilter] = None
+        self._indexedRowId = 0
+
         self.updateTable()
 
+    def __getstate__(self):
+        # The index is per process: a child process loads its own one if required.
+        state = self.__dict__.copy()
+        state["_index"] = None
+        state["_indexedRowId"] = 0
+        return state
+
+    @property
+    def indexSize(self) -> int:
+        """The in-memory index size in bytes, 0 if no index is loaded."""
+        index = self._index
+        return index.sizeInBytes if index is not None else 0
+
+    @retryOnBusy
+    def loadIndex(self) -> None:
+        """Build the in-memory index of the downloaded files' keys.
+
+        The index capacity is twice the current rows count (with a minimum of
+        INDEX_MIN_CAPACITY) so that it can absorb new downloads before a rebuild is
+        required.
+        """
+        start = time.perf_counter()
+        conn = self._connections.connection
+        rowsCount = conn.execute(
+            f"SELECT COUNT(*) FROM {self._tableName}"
+        ).fetchone()[0]
+        self._index = BloomFilter(
+            max(INDEX_MIN_CAPACITY, 2 * rowsCount), INDEX_ERROR_RATE
+        )
+        self._indexedRowId = 0
+        self._indexRows()
+        logging.info(
+            f"Downloaded files index loaded: {len(self._index)} keys, "
+            f"{self.indexSize / 1024:.0f} KiB in {time.perf_counter() - start:.3f} s"
+        )
+
+    @retryOnBusy
+    def refreshIndex(self) -> None:
+        """Add to the index the files downloaded since it was loaded or refreshed.
+
+        Catch up with the downloads recorded by other processes. The index is fully
+        rebuilt when it exceeds its capacity.
+        """
+        if self._index is None:
+            return
+        self._indexRows()
+        if self._index.isFull:
+            self.loadIndex()
+
+    def _indexRows(self) -> None:
+        index = self._index
+        cursor = self._connections.connection.execute(
+            self._indexSql, (self._indexedRowId,)
+        )
+        while True:
+            rows = cursor.fetchmany(INDEX_FETCH_SIZE)
+            if not rows:
+                break
+            index.update((name, size, mtime) for _rowId, name, size, mtime in rows)
+            self._indexedRowId = rows[-1][0]
+
+    @retryOnBusy
     def updateTable(self, reset: bool = False) -> None:
         """Create or update the database table
 
@@ -36,7 +302,7 @@ def updateTable(self, reset: bool = False) -> None:
             reset: if True, delete the contents of the table and re-build it.
         """
 
-        conn = sqlite3.connect(self._db, detect_types=sqlite3.PARSE_DECLTYPES)
+        conn = self._connections.connection
 
         if reset:
             conn.execute(fr"""DROP TABLE IF EXISTS {self._tableName}""")
@@ -60,9 +326,12 @@ def updateTable(self, reset: bool = False) -> None:
         )
 
         conn.commit()
-        conn.close()
 
-    # @retry(stop=stop_after_attempt(SQLITE3_RETRY_ATTEMPTS))
+    def close(self) -> None:
+        """Close the database connections of all threads of the calling process."""
+        self._connections.close()
+
+    @retryOnBusy
     def addDownloadedFile(
         self, name: str, size: int, modificationTime: float, downloadedAs: str
     ) -> None:
@@ -76,28 +345,26 @@ def addDownloadedFile(
             downloadedAs: renamed file including path, or the character '.' when the
                 user manually marked the file as previously downloaded.
         """
-        conn = sqlite3.connect(self._db, timeout=SQLITE3_TIMEOUT)
+        conn = self._connections.connection
 
         logging.debug(f"Adding {name} to downloaded files")
 
         try:
-            conn.execute(
-                fr"""INSERT OR REPLACE INTO {self._tableName} (file_name, size, mtime,
-                    download_name, download_datetime) VALUES (?,?,?,?,?)
-                """,
-                (name, size, modificationTime, downloadedAs, datetime.datetime.now()),
-            )
+            with conn:
+                conn.execute(
+                    self._insertSql,
+                    (name, size, modificationTime, downloadedAs, datetime.datetime.now()),
+                )
         except sqlite3.OperationalError as e:
             logging.warning(
                 f"Database error adding downloaded file {downloadedAs}: {e}. May retry."
             )
-            conn.close()
-            raise sqlite3.OperationalError from e
+            raise
         else:
-            conn.commit()
-            conn.close()
+            if self._index is not None:
+                self._index.add((name, size, modificationTime))
 
-    # @retry(stop=stop_after_attempt(SQLITE3_RETRY_ATTEMPTS))
+    @retryOnBusy
     def addDownloadedFiles(
         self, records: List[Tuple[str, int, float, str, datetime.datetime]]
     ) -> None:
@@ -107,27 +374,24 @@ def addDownloadedFiles(
         Args:
             records: images data to be added.
         """
-        conn = sqlite3.connect(self._db, timeout=SQLITE3_TIMEOUT)
+        conn = self._connections.connection
 
         logging.debug(f"Adding {len(records)} images to downloaded files")
 
         try:
-            conn.executemany(
-                fr"""INSERT OR REPLACE INTO {self._tableName} (file_name, size, mtime,
-                    download_name, download_datetime) VALUES (?,?,?,?,?)
-                """,
-                records,
-            )
+            with conn:
+                conn.executemany(self._insertSql, records)
         except sqlite3.OperationalError as e:
             logging.warning(
                 f"Database error adding downloaded files: {e}. May retry."
             )
-            conn.close()
-            raise sqlite3.OperationalError from e
+            raise
         else:
-            conn.commit()
-            conn.close()
+            index = self._index
+            if index is not None:
+                index.update((name, size, mtime) for name, size, mtime, *_ in records)
 
+    @retryOnBusy
     def fileIsPreviouslyDownloaded(
         self, name: str, size: int, modificationTime: float
     ) -> Optional[FileDownloaded]:
@@ -144,16 +408,478 @@ def fileIsPreviouslyDownloaded(
             image download name (including path) and when it was downloaded, None if
             never downloaded.
         """
-        conn = sqlite3.connect(self._db, detect_types=sqlite3.PARSE_DECLTYPES)
-        c = conn.cursor()
-        c.execute(
-            f"""SELECT download_name, download_datetime as [timestamp]
-                FROM {self._tableName} WHERE file_name=? AND size=? AND mtime=?
-            """,
-            (name, size, modificationTime),
-        )
-        row = c.fetchone()
+        index = self._index
+        if index is not None and (name, size, modificationTime) not in index:
+            return None
+
+        conn = self._connections.connection
+        row = conn.execute(self._selectSql, (name, size, modificationTime)).fetchone()
         if row is not None:
             return FileDownloaded(*row)
         else:
             return None
+
+    @retryOnBusy
+    def filesPreviouslyDownloaded(
+        self, records: List[FileKey]
+    ) -> Dict[FileKey, FileDownloaded]:
+        """
+        Returns download path and filename of the given files that have previously
+        been downloaded.
+
+        The whole records set is resolved in one query by joining the downloaded
+        files table with a temporary table holding the records.
+
+        Args:
+            records: images filename without path, size in bytes and modification
+                time.
+
+        Returns:
+            image download name (including path) and when it was downloaded, keyed by
+            (name, size, modification time), for the previously downloaded images
+            only.
+        """
+        index = self._index
+        if index is not None:
+            records = [record for record in records if record in index]
+            if not records:
+                return dict()
+
+        conn = self._connections.connection
+        with conn:
+            conn.execute(
+                """CREATE TEMP TABLE IF NOT EXISTS lookup (
+                    file_name TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL
+                )"""
+            )
+            conn.execute("DELETE FROM temp.lookup")
+            conn.executemany("INSERT INTO temp.lookup VALUES (?,?,?)", records)
+            rows = conn.execute(self._joinSql).fetchall()
+        return {
+            (name, size, mtime): FileDownloaded(downloadName, downloadTime)
+            for name, size, mtime, downloadName, downloadTime in rows
+        }
+
+
+class ExifCache:
+    """
+    Persistent cache of the images' exif, keyed by file identity.
+
+    A file is identified as in DownloadedDB, by its name (excluding path), size and
+    modification time, so that a card re-inserted under another drive letter is
+    still found. The cache stores the original date/time, the image geometry and
+    the embedded JPEG thumbnail location: the thumbnail itself is read from the
+    image file.
+
+    The cache holds at most maxRows files: the least recently used ones are
+    evicted when it is full. The rows are counted once: the count is then
+    estimated in memory, and only checked against the table when it may exceed
+    maxRows.
+    """
+
+    def __init__(
+        self, db: Optional[Path] = None, maxRows: int = EXIF_CACHE_MAX_ROWS
+    ) -> None:
+        if db is None:
+            settings = Config.fotocopSettings
+            db = settings.appDirs.user_cache_dir / "exif_cache.sqlite"
+        self._db = db
+        self._connections = ConnectionManager(db)
+        self._tableName = tableName = "exif"
+        self.maxRows = maxRows
+
+        self._upsertSql = (
+            f"""INSERT INTO {tableName} (file_name, size, mtime, date_time,
+                aspect_ratio, orientation, thumb_offset, thumb_length, last_access)
+                VALUES (?,?,?,?,?,?,?,?,?)
+                ON CONFLICT (file_name, size, mtime) DO UPDATE SET
+                date_time=excluded.date_time,
+                aspect_ratio=COALESCE(excluded.aspect_ratio, aspect_ratio),
+                orientation=COALESCE(excluded.orientation, orientation),
+                thumb_offset=COALESCE(excluded.thumb_offset, thumb_offset),
+                thumb_length=COALESCE(excluded.thumb_length, thumb_length),
+                last_access=excluded.last_access
+            """
+        )
+        self._joinSql = (
+            f"""SELECT e.rowid, e.file_name, e.size, e.mtime, e.date_time,
+                e.aspect_ratio, e.orientation, e.thumb_offset, e.thumb_length
+                FROM temp.lookup l JOIN {tableName} e
+                ON e.file_name=l.file_name AND e.size=l.size AND e.mtime=l.mtime
+            """
+        )
+
+        self.updateTable()
+
+        # Upper bound of the rows count: the updated files are counted as added.
+        self._rowsCountLock = threading.Lock()
+        self._rowsCount = self._countRows(self._connections.connection)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_rowsCountLock"]
+        return state
+
+    def __setstate__(self, state) -> None:
+        self.__dict__.update(state)
+        self._rowsCountLock = threading.Lock()
+
+    @retryOnBusy
+    def updateTable(self, reset: bool = False) -> None:
+        """Create or update the database table
+
+        Args:
+            reset: if True, delete the contents of the table and re-build it.
+        """
+        conn = self._connections.connection
+
+        if reset:
+            conn.execute(fr"""DROP TABLE IF EXISTS {self._tableName}""")
+            conn.execute("VACUUM")
+
+        conn.execute(
+            f"""CREATE TABLE IF NOT EXISTS {self._tableName} (
+                file_name TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                date_time TEXT NOT NULL,
+                aspect_ratio REAL,
+                orientation INTEGER,
+                thumb_offset INTEGER,
+                thumb_length INTEGER,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (file_name, size, mtime)
+            )"""
+        )
+
+        conn.execute(
+            f"""CREATE INDEX IF NOT EXISTS last_access_idx ON
+                {self._tableName} (last_access)
+            """
+        )
+
+        conn.commit()
+
+    def close(self) -> None:
+        """Close the database connections of all threads of the calling process."""
+        self._connections.close()
+
+    def _countRows(self, conn: sqlite3.Connection) -> int:
+        return conn.execute(f"SELECT COUNT(*) FROM {self._tableName}").fetchone()[0]
+
+    @retryOnBusy
+    def getExifs(self, records: List[FileKey]) -> Dict[FileKey, CachedExif]:
+        """
+        Returns the cached exif of the given files.
+
+        The found files are marked as recently used.
+
+        Args:
+            records: images filename without path, size in bytes and modification
+                time.
+
+        Returns:
+            the cached exif keyed by (name, size, modification time), for the cached
+            images only.
+        """
+        conn = self._connections.connection
+        with conn:
+            conn.execute(
+                """CREATE TEMP TABLE IF NOT EXISTS lookup (
+                    file_name TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL
+                )"""
+            )
+            conn.execute("DELETE FROM temp.lookup")
+            conn.executemany("INSERT INTO temp.lookup VALUES (?,?,?)", records)
+            rows = conn.execute(self._joinSql).fetchall()
+            if rows:
+                now = time.time()
+                conn.executemany(
+                    f"UPDATE {self._tableName} SET last_access=? WHERE rowid=?",
+                    [(now, row[0]) for row in rows],
+                )
+        return {
+            (name, size, mtime): CachedExif(*exif)
+            for _rowId, name, size, mtime, *exif in rows
+        }
+
+    @retryOnBusy
+    def putExifs(self, records: List[Tuple[FileKey, CachedExif]]) -> None:
+        """
+        Add or update files in the cache, then evict the least recently used files
+        if the cache is full.
+
+        The geometry and thumbnail location of a cached file are kept when the
+        given ones are None.
+
+        Args:
+            records: images identity and exif to be cached.
+        """
+        conn = self._connections.connection
+        now = time.time()
+        with self._rowsCountLock:
+            self._rowsCount += len(records)
+            mayBeFull = self._rowsCount > self.maxRows
+        with conn:
+            conn.executemany(
+                self._upsertSql,
+                [(*fileKey, *exif, now) for fileKey, exif in records],
+            )
+            if not mayBeFull:
+                return
+            rowsCount = self._countRows(conn)
+            if rowsCount > self.maxRows:
+                evictedCount = rowsCount - int(self.maxRows * EXIF_CACHE_EVICTION_RATIO)
+                conn.execute(
+                    f"""DELETE FROM {self._tableName} WHERE rowid IN (
+                        SELECT rowid FROM {self._tableName}
+                        ORDER BY last_access LIMIT ?
+                    )""",
+                    (evictedCount,),
+                )
+                logging.info(f"{evictedCount} files evicted from the exif cache")
+                rowsCount -= evictedCount
+            with self._rowsCountLock:
+                self._rowsCount = rowsCount
+
+
+class ThumbnailCache:
+    """
+    Persistent, size-bounded cache of the images' thumbnails.
+
+    Thumbnails are content-addressed: each distinct JPEG data is stored once in the
+    'blobs' table, keyed by its SHA-1 digest, and the 'thumbnails' table maps a file
+    identity (as in ExifCache) to its thumbnail digest and geometry. A card copied
+    several times, or re-inserted under another drive letter, thus shares its
+    thumbnails.
+
+    The cache holds at most maxBytes of JPEG data: the least recently used blobs,
+    and the files referencing them, are evicted when it is full. The bytes total is
+    kept up to date by triggers in the one-row 'blobs_size' table, so that the
+    budget check does not scan the blobs.
+    """
+
+    def __init__(
+        self, db: Optional[Path] = None, maxBytes: int = THUMBNAIL_CACHE_MAX_BYTES
+    ) -> None:
+        if db is None:
+            settings = Config.fotocopSettings
+            db = settings.appDirs.user_cache_dir / "thumbnail_cache.sqlite"
+        self._db = db
+        self._connections = ConnectionManager(db)
+        self.maxBytes = maxBytes
+
+        self._joinSql = (
+            """SELECT t.file_name, t.size, t.mtime, b.digest, b.data,
+                t.aspect_ratio, t.orientation
+                FROM temp.lookup l
+                JOIN thumbnails t
+                ON t.file_name=l.file_name AND t.size=l.size AND t.mtime=l.mtime
+                JOIN blobs b ON b.digest=t.digest
+            """
+        )
+
+        self.updateTable()
+
+    @retryOnBusy
+    def updateTable(self, reset: bool = False) -> None:
+        """Create or update the database tables
+
+        Args:
+            reset: if True, delete the contents of the tables and re-build them.
+        """
+        conn = self._connections.connection
+
+        blobsColumns = [row[1] for row in conn.execute("PRAGMA table_info(blobs)")]
+        if blobsColumns and blobsColumns[-1] != "data":
+            # Older layout, with the blobs size and access time stored after the
+            # data, in its overflow pages: rebuild the cache.
+            reset = True
+
+        if reset:
+            conn.execute("DROP TABLE IF EXISTS thumbnails")
+            conn.execute("DROP TABLE IF EXISTS blobs")
+            conn.execute("DROP TABLE IF EXISTS blobs_size")
+            conn.execute("VACUUM")
+
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS blobs (
+                digest BLOB PRIMARY KEY,
+                byte_size INTEGER NOT NULL,
+                last_access REAL NOT NULL,
+                data BLOB NOT NULL
+            )"""
+        )
+        conn.execute(
+            """CREATE INDEX IF NOT EXISTS blobs_last_access_idx ON
+                blobs (last_access, byte_size, digest)
+            """
+        )
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS blobs_size (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                total_bytes INTEGER NOT NULL
+            )"""
+        )
+        conn.execute(
+            """INSERT OR IGNORE INTO blobs_size
+                SELECT 0, COALESCE(SUM(byte_size), 0) FROM blobs
+            """
+        )
+        conn.execute(
+            """CREATE TRIGGER IF NOT EXISTS blobs_insert_trg AFTER INSERT ON blobs
+                BEGIN
+                    UPDATE blobs_size SET total_bytes = total_bytes + NEW.byte_size;
+                END
+            """
+        )
+        conn.execute(
+            """CREATE TRIGGER IF NOT EXISTS blobs_delete_trg AFTER DELETE ON blobs
+                BEGIN
+                    UPDATE blobs_size SET total_bytes = total_bytes - OLD.byte_size;
+                END
+            """
+        )
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS thumbnails (
+                file_name TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                digest BLOB NOT NULL,
+                aspect_ratio REAL NOT NULL,
+                orientation INTEGER NOT NULL,
+                PRIMARY KEY (file_name, size, mtime)
+            )"""
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS thumbnails_digest_idx ON thumbnails (digest)"
+        )
+        # A file whose thumbnail changes may leave its previous blob unreferenced:
+        # it is deleted, so that it no more counts in the bytes budget.
+        conn.execute(
+            """CREATE TRIGGER IF NOT EXISTS thumbnails_update_trg
+                AFTER UPDATE OF digest ON thumbnails
+                WHEN OLD.digest != NEW.digest
+                BEGIN
+                    DELETE FROM blobs WHERE digest = OLD.digest AND NOT EXISTS (
+                        SELECT 1 FROM thumbnails WHERE digest = OLD.digest
+                    );
+                END
+            """
+        )
+        # Blobs orphaned before the trigger existed.
+        conn.execute(
+            "DELETE FROM blobs WHERE digest NOT IN (SELECT digest FROM thumbnails)"
+        )
+
+        conn.commit()
+
+    def close(self) -> None:
+        """Close the database connections of all threads of the calling process."""
+        self._connections.close()
+
+    @retryOnBusy
+    def getThumbnails(
+        self, records: List[FileKey]
+    ) -> Dict[FileKey, CachedThumbnail]:
+        """
+        Returns the cached thumbnails of the given files.
+
+        The found thumbnails are marked as recently used.
+
+        Args:
+            records: images filename without path, size in bytes and modification
+                time.
+
+        Returns:
+            the cached thumbnails keyed by (name, size, modification time), for the
+            cached images only.
+        """
+        conn = self._connections.connection
+        with conn:
+            conn.execute(
+                """CREATE TEMP TABLE IF NOT EXISTS lookup (
+                    file_name TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL
+                )"""
+            )
+            conn.execute("DELETE FROM temp.lookup")
+            conn.executemany("INSERT INTO temp.lookup VALUES (?,?,?)", records)
+            rows = conn.execute(self._joinSql).fetchall()
+            if rows:
+                now = time.time()
+                conn.executemany(
+                    "UPDATE blobs SET last_access=? WHERE digest=?",
+                    [(now, digest) for digest in {row[3] for row in rows}],
+                )
+        return {
+            (name, size, mtime): CachedThumbnail(data, aspectRatio, orientation)
+            for name, size, mtime, _digest, data, aspectRatio, orientation in rows
+        }
+
+    @retryOnBusy
+    def putThumbnails(self, records: List[Tuple[FileKey, CachedThumbnail]]) -> None:
+        """
+        Add or update files' thumbnails in the cache, then evict the least recently
+        used thumbnails if the cache exceeds its bytes budget.
+
+        Args:
+            records: images identity and thumbnail to be cached.
+        """
+        conn = self._connections.connection
+        now = time.time()
+        blobs = dict()
+        thumbnails = list()
+        for fileKey, (data, aspectRatio, orientation) in records:
+            digest = hashlib.sha1(data).digest()
+            blobs[digest] = data
+            thumbnails.append((*fileKey, digest, aspectRatio, orientation))
+        with conn:
+            conn.executemany(
+                """INSERT INTO blobs (digest, byte_size, last_access, data)
+                    VALUES (?,?,?,?)
+                    ON CONFLICT (digest) DO UPDATE SET last_access=excluded.last_access
+                """,
+                [(digest, len(data), now, data) for digest, data in blobs.items()],
+            )
+            conn.executemany(
+                # Not INSERT OR REPLACE: its deletes do not fire the triggers.
+                """INSERT INTO thumbnails VALUES (?,?,?,?,?,?)
+                    ON CONFLICT (file_name, size, mtime) DO UPDATE SET
+                    digest=excluded.digest,
+                    aspect_ratio=excluded.aspect_ratio,
+                    orientation=excluded.orientation
+                """,
+                thumbnails,
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Evict the least recently used blobs down to the eviction ratio of the
+        bytes budget, when exceeded.
+        """
+        totalBytes = conn.execute("SELECT total_bytes FROM blobs_size").fetchone()[0]
+        if totalBytes <= self.maxBytes:
+            return
+
+        target = totalBytes - int(self.maxBytes * THUMBNAIL_CACHE_EVICTION_RATIO)
+        evicted = list()
+        evictedBytes = 0
+        for digest, byteSize in conn.execute(
+            "SELECT digest, byte_size FROM blobs ORDER BY last_access"
+        ):
+            evicted.append((digest,))
+            evictedBytes += byteSize
+            if evictedBytes >= target:
+                break
+        conn.executemany("DELETE FROM thumbnails WHERE digest=?", evicted)
+        conn.executemany("DELETE FROM blobs WHERE digest=?", evicted)
+        logging.info(
+            f"{len(evicted)} thumbnails ({evictedBytes} bytes) evicted from the "
+            f"thumbnail cache"
+        )
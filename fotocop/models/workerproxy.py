@@ -17,14 +17,14 @@
 
 
 class WorkerProxy:
-    def __init__(self, name: str) -> None:
+    def __init__(self, name: str, *args) -> None:
         self.name = name
 
         # Start the background process and establish a Pipe connection with it
         logger.info(f"Starting {name}...")
         workerConnection, child_conn1 = mp.Pipe()
         self._workerConnection = workerConnection
-        self._worker = workerFactory.create(name, child_conn1)
+        self._worker = workerFactory.create(name, child_conn1, *args)
         self._worker.start()
         child_conn1.close()
 
@@ -46,22 +46,41 @@ def stop(self) -> None:
 
 
 class ImageScanner(WorkerProxy):
-    def scan(self, path: str, includeSubDirs: bool) -> None:
-        Task(scanner.ImageScanner.Command.SCAN, path, includeSubDirs).execute(self._workerConnection)
+    def scan(
+        self,
+        path: str,
+        includeSubDirs: bool,
+        incremental: bool = False,
+        exifThumbnails: int = None,
+        exifGeneration: int = 0,
+    ) -> None:
+        Task(scanner.ImageScanner.Command.SCAN, path, includeSubDirs, incremental, exifThumbnails, exifGeneration).execute(self._workerConnection)
 
     def abort(self) -> None:
         Task(scanner.ImageScanner.Command.ABORT).execute(self._workerConnection)
 
 
 class ExifLoader(WorkerProxy):
-    def loadAll(self, imageKey) -> None:
-        Task(exifier.ExifLoader.Command.LOAD_ALL, imageKey).execute(self._workerConnection)
+    def loadAll(self, imageKey, path, generation) -> None:
+        Task(exifier.ExifLoader.Command.LOAD_ALL, imageKey, path, generation).execute(self._workerConnection)
 
-    def loadDatetime(self, imageKey) -> None:
-        Task(exifier.ExifLoader.Command.LOAD_DATE, imageKey).execute(self._workerConnection)
+    def loadDatetime(self, imageKey, path, generation) -> None:
+        Task(exifier.ExifLoader.Command.LOAD_DATE, imageKey, path, generation).execute(self._workerConnection)
 
-    def loadThumbnail(self, imageKey) -> None:
-        Task(exifier.ExifLoader.Command.LOAD_THUMB, imageKey).execute(self._workerConnection)
+    def loadThumbnail(self, imageKey, path, generation) -> None:
+        Task(exifier.ExifLoader.Command.LOAD_THUMB, imageKey, path, generation).execute(self._workerConnection)
+
+    def loadAllBatch(self, images, generation, priority=exifier.Priority.BACKGROUND) -> None:
+        Task(exifier.ExifLoader.Command.LOAD_ALL_BATCH, images, generation, priority).execute(self._workerConnection)
+
+    def loadDatetimeBatch(self, images, generation, priority=exifier.Priority.BACKGROUND) -> None:
+        Task(exifier.ExifLoader.Command.LOAD_DATE_BATCH, images, generation, priority).execute(self._workerConnection)
+
+    def prioritize(self, visibleKeys, nearKeys) -> None:
+        Task(exifier.ExifLoader.Command.PRIORITIZE, visibleKeys, nearKeys).execute(self._workerConnection)
+
+    def cancel(self, generation) -> None:
+        Task(exifier.ExifLoader.Command.CANCEL, generation).execute(self._workerConnection)
 
 
 class ImageMover(WorkerProxy):
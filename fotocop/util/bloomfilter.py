@@ -0,0 +1,107 @@
+"""A compact probabilistic set membership structure.
+
+A Bloom filter answers "definitely not in the set" or "possibly in the set" using a
+fixed bit array: there are no false negatives and the false positive rate is bounded
+by the filter capacity and its target error rate.
+"""
+import math
+from typing import Hashable, Iterator, Iterable
+
+__all__ = ["BloomFilter"]
+
+
+class BloomFilter:
+    """A Bloom filter of hashable keys.
+
+    The k bit positions of a key are derived from its 64 bits hash() by double
+    hashing (Kirsch-Mitzenmacher). As str hashes are salted per process, a filter
+    must be built and queried in the same process.
+
+    Args:
+        capacity: the expected number of keys.
+        errorRate: the target false positive rate when capacity keys are added.
+
+    Attributes:
+        capacity: the expected number of keys.
+        errorRate: the target false positive rate.
+    """
+
+    __slots__ = ("capacity", "errorRate", "_bitsCount", "_hashCount", "_bits", "_count")
+
+    def __init__(self, capacity: int, errorRate: float = 0.01) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be strictly positive")
+        if not 0 < errorRate < 1:
+            raise ValueError("errorRate must be in ]0, 1[")
+        self.capacity = capacity
+        self.errorRate = errorRate
+        ln2 = math.log(2)
+        self._bitsCount = bitsCount = math.ceil(
+            -capacity * math.log(errorRate) / (ln2 * ln2)
+        )
+        self._hashCount = max(1, round(bitsCount / capacity * ln2))
+        self._bits = bytearray((bitsCount + 7) // 8)
+        self._count = 0
+
+    def __len__(self) -> int:
+        """The number of keys added to the filter."""
+        return self._count
+
+    def __contains__(self, key: Hashable) -> bool:
+        bits = self._bits
+        for position in self._positions(key):
+            if not bits[position >> 3] >> (position & 7) & 1:
+                return False
+        return True
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(capacity={self.capacity}, "
+            f"errorRate={self.errorRate}, count={self._count})"
+        )
+
+    @property
+    def sizeInBytes(self) -> int:
+        """The bit array size in bytes."""
+        return len(self._bits)
+
+    @property
+    def isFull(self) -> bool:
+        """True when more keys than the filter capacity have been added."""
+        return self._count > self.capacity
+
+    def add(self, key: Hashable) -> None:
+        bits = self._bits
+        for position in self._positions(key):
+            bits[position >> 3] |= 1 << (position & 7)
+        self._count += 1
+
+    def update(self, keys: Iterable[Hashable]) -> None:
+        """Add all keys, a faster equivalent to add() called for each key."""
+        bits = self._bits
+        bitsCount = self._bitsCount
+        hashRange = range(self._hashCount)
+        count = 0
+        for key in keys:
+            h = hash(key) & 0xFFFFFFFFFFFFFFFF
+            h1 = h & 0xFFFFFFFF
+            h2 = h >> 32 | 1
+            for _ in hashRange:
+                position = h1 % bitsCount
+                bits[position >> 3] |= 1 << (position & 7)
+                h1 += h2
+            count += 1
+        self._count += count
+
+    def clear(self) -> None:
+        self._bits = bytearray(len(self._bits))
+        self._count = 0
+
+    def _positions(self, key: Hashable) -> Iterator[int]:
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        h1 = h & 0xFFFFFFFF
+        h2 = h >> 32 | 1
+        bitsCount = self._bitsCount
+        for _ in range(self._hashCount):
+            yield h1 % bitsCount
+            h1 += h2
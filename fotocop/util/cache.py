@@ -4,10 +4,13 @@
 """
 import collections
 import collections.abc
+from typing import NamedTuple
 
 __all__ = (
     "Cache",
     "LRUCache",
+    "MeteredLRUCache",
+    "CacheMetrics",
 )
 
 
@@ -162,3 +165,94 @@ def __update(self, key):
             self.__order.move_to_end(key)
         except KeyError:
             self.__order[key] = None
+
+
+class CacheMetrics(NamedTuple):
+    """A snapshot of a MeteredLRUCache usage."""
+
+    hits: int
+    misses: int
+    evictions: int
+    currsize: int
+    peaksize: int
+    maxsize: int
+
+    @property
+    def hitRatio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class MeteredLRUCache(LRUCache):
+    """LRU cache counting its hits, misses and evictions.
+
+    The size high-water mark is also recorded: with a getsizeof hook returning the
+    values size in bytes, the cache is budgeted and metered in bytes.
+    Only the item lookups (cache[key] and get()) are counted as hits or misses.
+    """
+
+    def __init__(self, maxsize, getsizeof=None):
+        LRUCache.__init__(self, maxsize, getsizeof)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.peaksize = 0
+
+    def __repr__(self):
+        return (
+            "%s(maxsize=%r, currsize=%r, peaksize=%r, hits=%r, misses=%r, "
+            "evictions=%r)"
+            % (
+                self.__class__.__name__,
+                self.maxsize,
+                self.currsize,
+                self.peaksize,
+                self.hits,
+                self.misses,
+                self.evictions,
+            )
+        )
+
+    def __getitem__(self, key, cache_getitem=LRUCache.__getitem__):
+        value = cache_getitem(self, key)
+        self.hits += 1
+        return value
+
+    def __missing__(self, key):
+        self.misses += 1
+        raise KeyError(key)
+
+    def __setitem__(self, key, value, cache_setitem=LRUCache.__setitem__):
+        cache_setitem(self, key, value)
+        self.peaksize = max(self.peaksize, self.currsize)
+
+    def get(self, key, default=None):
+        if key not in self:
+            self.misses += 1
+        return LRUCache.get(self, key, default)
+
+    def pop(self, key, *default):
+        # Removing an item is not a lookup.
+        hits = self.hits
+        try:
+            return LRUCache.pop(self, key, *default)
+        finally:
+            self.hits = hits
+
+    def popitem(self):
+        """Evict the `(key, value)` pair least recently used."""
+        item = LRUCache.popitem(self)
+        self.evictions += 1
+        return item
+
+    @property
+    def metrics(self) -> CacheMetrics:
+        """The cache usage counters."""
+        return CacheMetrics(
+            self.hits,
+            self.misses,
+            self.evictions,
+            self.currsize,
+            self.peaksize,
+            self.maxsize,
+        )
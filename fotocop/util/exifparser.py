@@ -0,0 +1,343 @@
+"""A minimal EXIF reader for the images' timeline and thumbnails.
+
+Only the EXIF tags required to build the timeline and the thumbnails grid are read:
+the original date/time, the orientation, the image dimensions and the embedded JPEG
+thumbnail. The file header is read with a bounded read and its TIFF structure
+is parsed in pure Python, avoiding an exiftool round trip.
+
+Supported files are JPEG (EXIF APP1 segment), TIFF based raw files (NEF, DNG) and
+Fujifilm RAF (whose embedded JPEG holds the EXIF). The larger JPEG preview of the
+raw files can also be read (see readPreview). The returned dict uses the
+exiftool keys (with the -G and -n options), so that it can be used in place of an
+exiftool output. None is returned when the file structure is not the expected one:
+the caller shall then fall back to exiftool.
+"""
+import re
+import struct
+from typing import Optional, Dict, Any, Tuple, List
+
+__all__ = ["readExif", "readThumbnail", "readPreview", "EXIF_READ_SIZE"]
+
+# Bytes read from the start of the file (or of the RAF embedded JPEG): the EXIF
+# APP1 segment is at most 64 KiB and the raw files' IFDs are in their header.
+EXIF_READ_SIZE = 256 * 1024
+
+_JPEG_SOI = b"\xff\xd8"
+_EXIF_HEADER = b"Exif\x00\x00"
+_RAF_MAGIC = b"FUJIFILMCCD-RAW "
+_RAF_JPEG_OFFSET = 84  # Big endian offset and length of the RAF embedded JPEG
+_DATETIME_FORMAT = re.compile(r"\d{4}:\d\d:\d\d \d\d:\d\d:\d\d")
+
+# TIFF tags
+_NEW_SUBFILE_TYPE = 0x00FE
+_IMAGE_WIDTH = 0x0100
+_IMAGE_HEIGHT = 0x0101
+_COMPRESSION = 0x0103
+_STRIP_OFFSETS = 0x0111
+_ORIENTATION = 0x0112
+_STRIP_BYTE_COUNTS = 0x0117
+_SUB_IFDS = 0x014A
+_THUMBNAIL_OFFSET = 0x0201
+_THUMBNAIL_LENGTH = 0x0202
+_EXIF_IFD = 0x8769
+_DATETIME_ORIGINAL = 0x9003
+_EXIF_IMAGE_WIDTH = 0xA002
+_EXIF_IMAGE_HEIGHT = 0xA003
+
+_IFD0_TAGS = {
+    _IMAGE_WIDTH: "EXIF:ImageWidth",
+    _IMAGE_HEIGHT: "EXIF:ImageHeight",
+    _ORIENTATION: "EXIF:Orientation",
+}
+_EXIF_TAGS = {
+    _DATETIME_ORIGINAL: "EXIF:DateTimeOriginal",
+    _EXIF_IMAGE_WIDTH: "EXIF:ExifImageWidth",
+    _EXIF_IMAGE_HEIGHT: "EXIF:ExifImageHeight",
+}
+
+# TIFF types of the read tags: BYTE, ASCII, SHORT and LONG.
+_READ_TYPES = {1, 2, 3, 4}
+# TIFF types of the SubIFDs tag: LONG and IFD.
+_SUB_IFDS_TYPES = {4, 13}
+# Reduced resolution image subfile type and JPEG compressions of a raw preview.
+_REDUCED_RESOLUTION = 1
+_JPEG_COMPRESSIONS = {6, 7}
+# Maximum IFDs visited when looking for previews, against IFDs loops.
+_MAX_IFDS = 32
+
+
+class _InvalidStructure(Exception):
+    pass
+
+
+def readExif(path: str, thumbnail: bool = True) -> Optional[Dict[str, Any]]:
+    """Read the timeline and thumbnail EXIF tags of an image file.
+
+    Args:
+        path: the image file path.
+        thumbnail: if True, the embedded JPEG thumbnail is also read. A raw file
+            without a JPEG thumbnail in its IFD1 is then reported as unknown, as
+            exiftool extracts other previews from it.
+
+    Returns:
+        the found tags, keyed as in an exiftool JSON output: the thumbnail is
+        returned as bytes in "EXIF:ThumbnailImage", with its absolute offset and
+        length in the file in "EXIF:ThumbnailOffset" and "EXIF:ThumbnailLength".
+        None if the file structure is unknown.
+
+    Raises:
+        OSError: the file cannot be read.
+    """
+    with open(path, "rb") as f:
+        data = f.read(EXIF_READ_SIZE)
+        base = 0
+        if data.startswith(_RAF_MAGIC):
+            if len(data) < _RAF_JPEG_OFFSET + 8:
+                return None
+            base, length = struct.unpack_from(">II", data, _RAF_JPEG_OFFSET)
+            f.seek(base)
+            data = f.read(min(length, EXIF_READ_SIZE))
+            if not data.startswith(_JPEG_SOI):
+                return None
+            rawFile = False
+        else:
+            rawFile = not data.startswith(_JPEG_SOI)
+
+    try:
+        if rawFile:
+            tiffStart = 0
+        else:
+            tiffStart = _findExifSegment(data)
+            if tiffStart is None:
+                # A JPEG file without EXIF
+                return dict()
+        exif, thumbOffset, thumbLength = _readTiff(data, tiffStart)
+    except (_InvalidStructure, struct.error):
+        return None
+
+    dateTime = exif.get("EXIF:DateTimeOriginal")
+    if dateTime is not None and not _DATETIME_FORMAT.match(dateTime):
+        # An unset date (e.g. "    :  :     :  :  ")
+        del exif["EXIF:DateTimeOriginal"]
+
+    if thumbOffset is not None:
+        # Thumbnail offset is relative to the TIFF header.
+        start = tiffStart + thumbOffset
+        thumbData = data[start:start + thumbLength]
+        if len(thumbData) != thumbLength or not thumbData.startswith(_JPEG_SOI):
+            return None
+        exif["EXIF:ThumbnailOffset"] = base + start
+        exif["EXIF:ThumbnailLength"] = thumbLength
+        if thumbnail:
+            exif["EXIF:ThumbnailImage"] = thumbData
+    elif thumbnail and rawFile:
+        return None
+    return exif
+
+
+def readThumbnail(path: str, offset: int, length: int) -> Optional[bytes]:
+    """Read an embedded JPEG thumbnail from its absolute offset and length.
+
+    Returns:
+        the thumbnail JPEG data, None if no JPEG is found at offset.
+
+    Raises:
+        OSError: the file cannot be read.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read(length)
+    if len(data) != length or not data.startswith(_JPEG_SOI):
+        return None
+    return data
+
+
+def readPreview(path: str) -> Optional[bytes]:
+    """Read the largest JPEG preview embedded in a raw file.
+
+    The previews are looked for in the IFDs chain and the SubIFDs of the TIFF based
+    raw files: as JPEGInterchangeFormat (e.g. NEF) or as a JPEG compressed reduced
+    resolution image (e.g. DNG). The RAF embedded JPEG is the preview.
+
+    Returns:
+        the preview JPEG data, None if the file is not a raw file or has no preview.
+
+    Raises:
+        OSError: the file cannot be read.
+    """
+    with open(path, "rb") as f:
+        data = f.read(EXIF_READ_SIZE)
+        if data.startswith(_JPEG_SOI):
+            return None
+        try:
+            if data.startswith(_RAF_MAGIC):
+                previews = [struct.unpack_from(">II", data, _RAF_JPEG_OFFSET)]
+            else:
+                previews = _findPreviews(data)
+        except (_InvalidStructure, struct.error):
+            return None
+        for offset, length in sorted(previews, key=lambda p: p[1], reverse=True):
+            f.seek(offset)
+            preview = f.read(length)
+            if len(preview) == length and preview.startswith(_JPEG_SOI):
+                return preview
+    return None
+
+
+def _findPreviews(data: bytes) -> List[Tuple[int, int]]:
+    """Return the (offset, length) of the JPEG previews of a TIFF based raw file."""
+    byteOrder = data[:2]
+    if byteOrder == b"II":
+        endian = "<"
+    elif byteOrder == b"MM":
+        endian = ">"
+    else:
+        raise _InvalidStructure
+    magic, ifdOffset = struct.unpack_from(f"{endian}HI", data, 2)
+    if magic != 42:
+        raise _InvalidStructure
+
+    previews = list()
+    toVisit = [ifdOffset]
+    visited = set()
+    while toVisit and len(visited) < _MAX_IFDS:
+        ifdOffset = toVisit.pop()
+        if not ifdOffset or ifdOffset in visited:
+            continue
+        visited.add(ifdOffset)
+        ifd, nextIfd = _readIfd(data, 0, ifdOffset, endian)
+        toVisit.append(nextIfd)
+        toVisit.extend(ifd.get(_SUB_IFDS, ()))
+
+        offset = ifd.get(_THUMBNAIL_OFFSET)
+        length = ifd.get(_THUMBNAIL_LENGTH)
+        if (
+            offset is None
+            and ifd.get(_NEW_SUBFILE_TYPE) == _REDUCED_RESOLUTION
+            and ifd.get(_COMPRESSION) in _JPEG_COMPRESSIONS
+        ):
+            offset = ifd.get(_STRIP_OFFSETS)
+            length = ifd.get(_STRIP_BYTE_COUNTS)
+        if offset and length:
+            previews.append((offset, length))
+    return previews
+
+
+def _findExifSegment(data: bytes) -> Optional[int]:
+    """Return the TIFF header position of the JPEG EXIF APP1 segment, if any."""
+    pos = 2
+    size = len(data)
+    while pos + 4 <= size:
+        if data[pos] != 0xFF:
+            raise _InvalidStructure
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            # Fill byte
+            pos += 1
+            continue
+        if marker == 0xDA or marker == 0xD9:
+            # Start of scan or end of image: no more metadata
+            return None
+        segmentLength = struct.unpack_from(">H", data, pos + 2)[0]
+        if marker == 0xE1 and data[pos + 4:pos + 10] == _EXIF_HEADER:
+            return pos + 10
+        pos += 2 + segmentLength
+    raise _InvalidStructure
+
+
+def _readTiff(data: bytes, start: int) -> Tuple[Dict[str, Any], Optional[int], int]:
+    """Read the IFD0, EXIF and IFD1 tags of the TIFF structure at 'start'.
+
+    Returns:
+        the exif tags, the thumbnail offset relative to the TIFF header (None if no
+        thumbnail) and its length.
+    """
+    byteOrder = data[start:start + 2]
+    if byteOrder == b"II":
+        endian = "<"
+    elif byteOrder == b"MM":
+        endian = ">"
+    else:
+        raise _InvalidStructure
+    magic, ifd0Offset = struct.unpack_from(f"{endian}HI", data, start + 2)
+    if magic != 42:
+        raise _InvalidStructure
+
+    exif = dict()
+    ifd0, ifd1Offset = _readIfd(data, start, ifd0Offset, endian)
+    for tag, key in _IFD0_TAGS.items():
+        if tag in ifd0:
+            exif[key] = ifd0[tag]
+    exifIfdOffset = ifd0.get(_EXIF_IFD)
+    if exifIfdOffset:
+        exifIfd, _ = _readIfd(data, start, exifIfdOffset, endian)
+        for tag, key in _EXIF_TAGS.items():
+            if tag in exifIfd:
+                exif[key] = exifIfd[tag]
+
+    thumbOffset = None
+    thumbLength = 0
+    if ifd1Offset:
+        ifd1, _ = _readIfd(data, start, ifd1Offset, endian)
+        thumbOffset = ifd1.get(_THUMBNAIL_OFFSET)
+        thumbLength = ifd1.get(_THUMBNAIL_LENGTH, 0)
+        if not thumbLength:
+            thumbOffset = None
+    return exif, thumbOffset, thumbLength
+
+
+def _readIfd(
+    data: bytes, start: int, offset: int, endian: str
+) -> Tuple[Dict[int, Any], int]:
+    """Read the single valued SHORT, LONG and ASCII tags of an IFD.
+
+    Returns:
+        the tags values keyed by tag id and the next IFD offset.
+    """
+    pos = start + offset
+    count = struct.unpack_from(f"{endian}H", data, pos)[0]
+    pos += 2
+    if pos + count * 12 + 4 > len(data):
+        raise _InvalidStructure
+    tags = dict()
+    entry = struct.Struct(f"{endian}HHI4s")
+    for i in range(count):
+        tag, type_, valuesCount, value = entry.unpack_from(data, pos + i * 12)
+        if tag == _SUB_IFDS and type_ in _SUB_IFDS_TYPES:
+            tags[tag] = _readLongs(data, start, value, valuesCount, endian)
+            continue
+        if type_ not in _READ_TYPES:
+            continue
+        if type_ == 2:
+            if valuesCount > 4:
+                valueOffset = struct.unpack(f"{endian}I", value)[0]
+                valueStart = start + valueOffset
+                value = data[valueStart:valueStart + valuesCount]
+                if len(value) != valuesCount:
+                    raise _InvalidStructure
+            tags[tag] = _decodeAscii(value[:valuesCount])
+        elif valuesCount == 1:
+            if type_ == 3:
+                tags[tag] = struct.unpack_from(f"{endian}H", value)[0]
+            elif type_ == 4:
+                tags[tag] = struct.unpack(f"{endian}I", value)[0]
+            else:
+                tags[tag] = value[0]
+    nextIfd = struct.unpack_from(f"{endian}I", data, pos + count * 12)[0]
+    return tags, nextIfd
+
+
+def _readLongs(
+    data: bytes, start: int, value: bytes, count: int, endian: str
+) -> Tuple[int, ...]:
+    """Read the LONG values of an IFD entry, inline or at the value offset."""
+    if count == 1:
+        return struct.unpack(f"{endian}I", value)
+    valueStart = start + struct.unpack(f"{endian}I", value)[0]
+    if valueStart + count * 4 > len(data):
+        raise _InvalidStructure
+    return struct.unpack_from(f"{endian}{count}I", data, valueStart)
+
+
+def _decodeAscii(value: bytes) -> str:
+    return value.split(b"\x00", 1)[0].decode("ascii", "replace").strip()
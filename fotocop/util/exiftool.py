@@ -83,8 +83,12 @@
 
 # The block size when reading from exiftool.  The standard value
 # should be fine, though other values might give better performance in
-# some cases.
-block_size = 4096
+# some cases.  It can also be set per instance.
+block_size = 65536
+
+# Marker of the end of a file's JSON object in the exiftool output: the
+# closing brace of the top-level objects is the only one at a line start.
+_json_object_end = b"\n}"
 
 
 # This code has been adapted from Lib/os.py in the Python source tree
@@ -154,12 +158,13 @@ class ExifTool(object):
        associated with a running subprocess.
     """
 
-    def __init__(self, executable_=None):
+    def __init__(self, executable_=None, block_size_=None):
         if executable_ is None:
             self.executable = executable
         else:
             self.executable = executable_
             self._process = None
+        self.block_size = block_size if block_size_ is None else block_size_
         self.running = False
 
     def start(self):
@@ -227,15 +232,37 @@ def execute(self, *params):
         .. note:: This is considered a low-level method, and should
            rarely be needed by application developers.
         """
+        self._send(params)
+        output = bytearray()
+        for _ in self._read_blocks(output):
+            pass
+        # Drop the sentinel in place, without copying the whole output.
+        del output[output.rfind(sentinel):]
+        return bytes(output).strip()
+
+    def _send(self, params):
         if not self.running:
             raise ValueError("ExifTool instance not running.")
         self._process.stdin.write(b"\n".join(params + (b"-execute\n",)))
         self._process.stdin.flush()
-        output = b""
+
+    def _read_blocks(self, output):
+        """Read the exiftool output up to the sentinel into the ``output``
+        bytearray, yielding after each block read.
+
+        The output grows in place and only its tail is searched for the
+        sentinel, so that reading is linear in the output size.
+        """
         fd = self._process.stdout.fileno()
-        while not output[-32:].strip().endswith(sentinel):
-            output += os.read(fd, block_size)
-        return output.strip()[:-len(sentinel)]
+        block_size = self.block_size
+        while True:
+            block = os.read(fd, block_size)
+            if not block:
+                raise IOError("ExifTool process closed its output.")
+            output += block
+            yield
+            if output[-32:].strip().endswith(sentinel):
+                return
 
     def execute_json(self, *params):
         """Execute the given batch of parameters and parse the JSON output.
@@ -262,6 +289,41 @@ def execute_json(self, *params):
         params = map(fsencode, params)
         return json.loads(self.execute(b"-j", b"-b", *params).decode("utf-8"))
 
+    def execute_json_iter(self, *params):
+        """Execute the given batch of parameters and yield the JSON object of
+        each file as soon as it is output by ``exiftool``.
+
+        This method is similar to :py:meth:`execute_json()` but the
+        output is parsed incrementally: a batch of files can be
+        processed while ``exiftool`` is still working on the next ones.
+        If the iteration is stopped early (the iterator is closed or
+        an object cannot be parsed), the rest of the output is read
+        and dropped, so that the next command reads its own output.
+        """
+        params = tuple(map(fsencode, params))
+        self._send((b"-j", b"-b") + params)
+        output = bytearray()
+        search_pos = 0
+        blocks = self._read_blocks(output)
+        try:
+            for _ in blocks:
+                while True:
+                    end = output.find(_json_object_end, search_pos)
+                    if end < 0:
+                        # Resume the search with the last byte, which may be
+                        # the beginning of the marker.
+                        search_pos = max(0, len(output) - 1)
+                        break
+                    end += len(_json_object_end)
+                    start = output.find(b"{")
+                    obj = output[start:end]
+                    del output[:end]
+                    search_pos = 0
+                    yield json.loads(obj.decode("utf-8"))
+        finally:
+            for _ in blocks:
+                del output[:-32]
+
     def get_metadata_batch(self, filenames):
         """Return all meta-data for the given files.
 
@@ -278,7 +340,7 @@ def get_metadata(self, filename):
         """
         return self.execute_json(filename)[0]
 
-    def get_tags_batch(self, tags, filenames):
+    def get_tags_batch(self, tags, filenames, options=()):
         """Return only specified tags for the given files.
 
         The first argument is an iterable of tags.  The tag names may
@@ -286,6 +348,9 @@ def get_tags_batch(self, tags, filenames):
 
         The second argument is an iterable of file names.
 
+        The optional third argument is an iterable of exiftool options
+        (e.g. ``"-fast2"``) added to the command.
+
         The format of the return value is the same as for
         :py:meth:`execute_json()`.
         """
@@ -297,10 +362,29 @@ def get_tags_batch(self, tags, filenames):
         if isinstance(filenames, basestring):
             raise TypeError("The argument 'filenames' must be "
                             "an iterable of strings")
-        params = ["-" + t for t in tags]
+        params = list(options)
+        params.extend("-" + t for t in tags)
         params.extend(filenames)
         return self.execute_json(*params)
 
+    def get_tags_batch_iter(self, tags, filenames, options=()):
+        """Yield the specified tags of the given files, file by file.
+
+        The arguments are the same as for :py:meth:`get_tags_batch()`.
+        The tags of each file are yielded as soon as ``exiftool``
+        outputs them, see :py:meth:`execute_json_iter()`.
+        """
+        if isinstance(tags, basestring):
+            raise TypeError("The argument 'tags' must be "
+                            "an iterable of strings")
+        if isinstance(filenames, basestring):
+            raise TypeError("The argument 'filenames' must be "
+                            "an iterable of strings")
+        params = list(options)
+        params.extend("-" + t for t in tags)
+        params.extend(filenames)
+        return self.execute_json_iter(*params)
+
     def get_tags(self, tags, filename):
         """Return only specified tags for a single file.
 
@@ -0,0 +1,104 @@
+"""Make a thumbnail of the images that have no EXIF thumbnail.
+
+The thumbnail is scaled from the largest JPEG preview embedded in raw files, read
+natively (see exifparser.readPreview) or else by exiftool (PreviewImage, then
+JpgFromRaw). When there is no preview, the image itself is decoded at a reduced
+scale: the JPEG decoder then skips most of the DCT work.
+
+makeThumbnail() is run in a process pool (see ExifLoader): the decoding and scaling
+are CPU bound and would hold the GIL of the exif loading threads.
+"""
+import logging
+from typing import Optional
+
+import PyQt5.QtCore as QtCore
+import PyQt5.QtGui as QtGui
+
+from fotocop.util import exiftool
+from fotocop.util import exifparser
+
+__all__ = ["makeThumbnail", "FALLBACK_THUMBNAIL_WIDTH"]
+
+logger = logging.getLogger(__name__)
+
+# The thumbnails made are larger than the view thumbnails, as the EXIF ones (160px),
+# so that they are rendered the same way.
+FALLBACK_THUMBNAIL_WIDTH = 320
+FALLBACK_THUMBNAIL_QUALITY = 85
+
+# The preview tags read by exiftool, the preferred first.
+PREVIEW_TAGS = (b"-PreviewImage", b"-JpgFromRaw")
+
+# The exiftool process of the pool process, started on its first use.
+_exifTool = None
+
+
+def makeThumbnail(path: str) -> Optional[bytes]:
+    """Make a JPEG thumbnail of an image.
+
+    Args:
+        path: the image file path.
+
+    Returns:
+        the JPEG thumbnail, FALLBACK_THUMBNAIL_WIDTH pixels wide, or None if the
+        image cannot be decoded.
+    """
+    for imgdata in _previews(path):
+        thumbnail = _scale(QtCore.QBuffer(QtCore.QByteArray(imgdata)))
+        if thumbnail is not None:
+            return thumbnail
+    thumbnail = _scale(QtCore.QFile(path))
+    if thumbnail is None:
+        logger.debug(f"Cannot make a thumbnail of {path}")
+    return thumbnail
+
+
+def _previews(path: str):
+    """Yield the JPEG previews of the image, the preferred first."""
+    try:
+        preview = exifparser.readPreview(path)
+    except OSError as e:
+        logger.debug(f"Cannot read preview of {path}: {e}")
+        preview = None
+    if preview:
+        yield preview
+        return
+
+    global _exifTool
+    for tag in PREVIEW_TAGS:
+        try:
+            if _exifTool is None:
+                _exifTool = exiftool.ExifTool()
+                _exifTool.start()
+            preview = _exifTool.execute(b"-b", tag, exiftool.fsencode(path))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cannot read preview of {path} with exiftool: {e}")
+            return
+        if preview:
+            yield preview
+
+
+def _scale(device: QtCore.QIODevice) -> Optional[bytes]:
+    """Decode the image of a device at a reduced scale and encode it to JPEG."""
+    reader = QtGui.QImageReader(device)
+    # The orientation is applied when the thumbnail is rendered.
+    reader.setAutoTransform(False)
+    size = reader.size()
+    if size.isValid() and size.width() > FALLBACK_THUMBNAIL_WIDTH:
+        reader.setScaledSize(
+            QtCore.QSize(
+                FALLBACK_THUMBNAIL_WIDTH,
+                max(1, size.height() * FALLBACK_THUMBNAIL_WIDTH // size.width()),
+            )
+        )
+    image = reader.read()
+    if image.isNull():
+        return None
+
+    data = QtCore.QByteArray()
+    buffer = QtCore.QBuffer(data)
+    buffer.open(QtCore.QIODevice.WriteOnly)
+    if not image.save(buffer, "JPG", FALLBACK_THUMBNAIL_QUALITY):
+        return None
+    buffer.close()
+    return bytes(data)
@@ -1,7 +1,9 @@
 import logging
+import queue
+import threading
 import multiprocessing as mp
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, Tuple, Callable, Dict
+from typing import TYPE_CHECKING, Tuple, Callable, Dict, Optional
 
 from fotocop.util.logutil import LogConfig, configureRootLogger
 
@@ -21,7 +23,15 @@ class Message:
 
 
 class BackgroundWorker(mp.Process):
-    def __init__(self, conn: "Connection", name: str = None) -> None:
+    """A background process executing the commands received from the main process.
+
+    Commands are (action, args) tuples received on the 'conn' Pipe connection and,
+    optionally, on a 'taskQueue' fed by another worker process. Commands received on
+    the connection take precedence over the queued ones.
+    """
+    def __init__(
+        self, conn: "Connection", name: str = None, taskQueue: Optional[mp.Queue] = None
+    ) -> None:
         super().__init__(name=name)
 
         logConfig = LogConfig()
@@ -29,10 +39,14 @@ def __init__(self, conn: "Connection", name: str = None) -> None:
         self.logLevel = logConfig.logLevel
 
         self._conn = conn
+        self._taskQueue = taskQueue
         self._exitProcess = mp.Event()
 
         self._actions: Dict["Enum", Callable] = dict()
 
+        # Created in the worker process, as locks cannot be sent to it.
+        self._publishLock: Optional[threading.Lock] = None
+
     def registerAction(self, action: "Enum", func: Callable) -> None:
         if action not in self._actions:
             self._actions[action] = func
@@ -42,30 +56,48 @@ def run(self) -> None:
         """
         configureRootLogger(self.logQueue, self.logLevel)
 
+        # Data may be published from several threads of the worker.
+        self._publishLock = threading.Lock()
+
         self._preRun()
 
         self._exitProcess.clear()
 
         logger.info(f"{self.name} started")
+        conn = self._conn
+        taskQueue = self._taskQueue
         while True:
-            conn = self._conn
+            busy = False
             if conn.poll():
-                action, args = conn.recv()
+                busy = True
+                self._execute(*conn.recv())
+            if taskQueue is not None:
                 try:
-                    self._actions[action](*args)
-                except KeyError:
-                    logger.warning(f"Unknown command {action} ignored")
-            if self._exitProcess.wait(timeout=0.01):
+                    action, args = taskQueue.get_nowait()
+                except queue.Empty:
+                    pass
+                else:
+                    busy = True
+                    self._execute(action, args)
+            # Do not wait between commands while there are pending ones.
+            if self._exitProcess.wait(timeout=0 if busy else 0.01):
                 break
 
         self._conn.close()
         self._postRun()
         logger.info(f"{self.name} stopped")
 
+    def _execute(self, action: "Enum", args: Tuple) -> None:
+        try:
+            self._actions[action](*args)
+        except KeyError:
+            logger.warning(f"Unknown command {action} ignored")
+
     def publishData(self, content: str, *data) -> None:
         msg = Message(content, data)
         try:
-            self._conn.send(msg)
+            with self._publishLock:
+                self._conn.send(msg)
             logger.debug(f"Data published: {msg}")
         except (OSError, EOFError, BrokenPipeError):
             pass